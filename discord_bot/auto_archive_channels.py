@@ -4,12 +4,15 @@ Auto-Archive Inactive Channels Script
 Automatically moves channels with no messages in the last 30 days to the Archive category.
 """
 
-import asyncio
+import argparse
 import os
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import discord
-from discord.ext import commands
+
+from profiling import add_profile_arguments, profiler_from_args, run_profiled
+from runtime import make_bot
+from scheduler import MAINTENANCE, scheduler_report
 
 load_dotenv()
 
@@ -19,12 +22,8 @@ INACTIVITY_DAYS = 30  # Number of days of inactivity before archiving
 NOTIFICATION_CHANNEL_ID = 1382205920502743110  # MCP channel for notifications
 NOTIFY_USER_ID = 170328940798279689  # Evan's user ID
 
-# Configure intents
-intents = discord.Intents.default()
-intents.message_content = True
-intents.guilds = True
-
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Lowest REST priority: channel moves wait behind live posts and backfills
+bot = make_bot(members=False, priority=MAINTENANCE)
 
 
 async def get_last_message_date(channel):
@@ -124,9 +123,6 @@ async def on_ready():
                         except Exception as e:
                             print(f"    (Failed to send notification: {e})")
 
-                    # Small delay to avoid rate limits
-                    await asyncio.sleep(1)
-
                 except discord.Forbidden:
                     print(f"✗ No permission to move channel")
                 except discord.HTTPException as e:
@@ -144,12 +140,17 @@ async def on_ready():
     print(f"  Channels archived: {total_archived}")
     print(f"  Inactivity threshold: {INACTIVITY_DAYS} days")
     print("=" * 60)
+    print(scheduler_report())
 
     # Close the bot after archiving is complete
     await bot.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move inactive channels to the archive category")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
     if not TOKEN:
         print("Error: DISCORD_TOKEN not found in .env file")
         exit(1)
@@ -157,4 +158,4 @@ if __name__ == "__main__":
     print("Starting Discord bot for auto-archiving inactive channels...")
     print()
 
-    bot.run(TOKEN)
+    run_profiled(profiler_from_args("auto-archive", args), lambda: bot.run(TOKEN))
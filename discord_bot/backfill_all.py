@@ -1,36 +1,63 @@
 #!/usr/bin/env python3
 """
 Automated Bulk Backfill Script
-Fetches messages from the last 120 days across all channels in specified guilds.
+Fetches messages from the last 120 days across all channels, threads and
+forum posts in specified guilds.
 """
 
+import argparse
 import asyncio
 import os
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import discord
-from discord.ext import commands
 
 from db import (
-    upsert_user,
+    MessageBatchWriter,
+    pool_report,
     upsert_guild,
     upsert_channel,
-    insert_message,
-    insert_attachments,
 )
+from history import backfill_history
+from profiling import add_profile_arguments, profiler_from_args, run_profiled
+from runtime import LOW_MEMORY, RecentIds, make_bot, memory_report
+from scheduler import BACKFILL, scheduler_report
+from threads import THREAD_CONCURRENCY, enumerate_threads, thread_parents
 
 load_dotenv()
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 DAYS_TO_BACKFILL = 120  # Number of days to fetch messages from
 
-# Configure intents
-intents = discord.Intents.default()
-intents.message_content = True
-intents.guilds = True
-intents.members = True
+bot = make_bot(priority=BACKFILL)
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+async def backfill_threads(guild, parents, cutoff_date, writer, seen_users):
+    """Backfill active and archived threads (including forum posts) of a guild."""
+    threads = await enumerate_threads(guild, parents, cutoff=cutoff_date)
+    print(f"  Found {len(threads)} threads and forum posts")
+
+    semaphore = asyncio.Semaphore(THREAD_CONCURRENCY)
+
+    async def backfill_thread(thread):
+        async with semaphore:
+            try:
+                upsert_channel(thread)
+                count = await backfill_history(thread, cutoff_date, writer, seen_users)
+                print(f"  ✓ Thread #{thread.name}: {count} messages")
+                return count
+            except discord.Forbidden:
+                print(f"  ✗ No access to thread #{thread.name}")
+            except discord.HTTPException as e:
+                print(f"  ✗ HTTP error in thread #{thread.name}: {e}")
+            except Exception as e:
+                print(f"  ✗ Error in thread #{thread.name}: {e}")
+            return None
+
+    counts = await asyncio.gather(*(backfill_thread(t) for t in threads))
+    writer.flush()
+    done = [c for c in counts if c is not None]
+    return len(done), sum(done)
 
 
 @bot.event
@@ -47,79 +74,32 @@ async def on_ready():
 
     total_messages = 0
     total_channels = 0
+    total_threads = 0
+    seen_users = RecentIds()
+    writer = MessageBatchWriter()
 
     # Process all guilds
     for guild in bot.guilds:
         print(f"Processing guild: {guild.name} (ID: {guild.id})")
         upsert_guild(guild)
 
-        # Get all text channels
-        text_channels = [ch for ch in guild.channels if isinstance(ch, discord.TextChannel)]
-        print(f"  Found {len(text_channels)} text channels")
+        # Text channels hold messages directly; forums only hold posts (threads)
+        parents = thread_parents(guild)
+        text_channels = [ch for ch in parents if isinstance(ch, discord.TextChannel)]
+        forum_channels = [ch for ch in parents if isinstance(ch, discord.ForumChannel)]
+        print(f"  Found {len(text_channels)} text channels and {len(forum_channels)} forums")
+
+        for forum in forum_channels:
+            upsert_channel(forum)
 
         for channel in text_channels:
             try:
                 print(f"  Backfilling #{channel.name}...", end=" ", flush=True)
                 upsert_channel(channel)
 
-                channel_message_count = 0
-
-                # Fetch messages from newest to oldest until we hit the cutoff date
-                async for message in channel.history(limit=None, oldest_first=False):
-                    # Stop if message is older than cutoff date
-                    if message.created_at < cutoff_date:
-                        break
-
-                    # Skip messages without a guild (shouldn't happen in text channels)
-                    if message.guild is None:
-                        continue
-
-                    # Upsert user and guild data
-                    upsert_user(message.author)
-
-                    # Create message data dictionary
-                    raw_data = {
-                        "id": str(message.id),
-                        "content": message.content,
-                        "author": {
-                            "id": str(message.author.id),
-                            "name": message.author.name,
-                            "discriminator": getattr(message.author, "discriminator", None),
-                            "bot": message.author.bot,
-                        },
-                        "channel_id": str(message.channel.id),
-                        "guild_id": str(message.guild.id) if message.guild else None,
-                        "created_at": message.created_at.isoformat(),
-                        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
-                        "pinned": message.pinned,
-                        "tts": message.tts,
-                        "mention_everyone": message.mention_everyone,
-                        "mentions": [str(u.id) for u in message.mentions],
-                        "attachments": [
-                            {
-                                "id": str(a.id),
-                                "filename": a.filename,
-                                "url": a.url,
-                                "size": a.size,
-                                "content_type": a.content_type,
-                            }
-                            for a in message.attachments
-                        ],
-                    }
-
-                    # Insert message and attachments
-                    insert_message(message, raw_data)
-                    insert_attachments(message)
-
-                    channel_message_count += 1
-
-                    # Progress indicator every 100 messages
-                    if channel_message_count % 100 == 0:
-                        print(f"{channel_message_count}...", end=" ", flush=True)
-
-                    # Small delay to avoid rate limits
-                    if channel_message_count % 50 == 0:
-                        await asyncio.sleep(0.5)
+                channel_message_count = await backfill_history(
+                    channel, cutoff_date, writer, seen_users, progress=True
+                )
 
                 print(f"✓ {channel_message_count} messages")
                 total_messages += channel_message_count
@@ -132,27 +112,43 @@ async def on_ready():
             except Exception as e:
                 print(f"✗ Error: {e}")
 
+        thread_count, thread_message_count = await backfill_threads(
+            guild, parents, cutoff_date, writer, seen_users
+        )
+        total_threads += thread_count
+        total_messages += thread_message_count
+
         print()
 
     print("=" * 60)
     print(f"Backfill complete!")
     print(f"  Guilds processed: {len(bot.guilds)}")
     print(f"  Channels backfilled: {total_channels}")
+    print(f"  Threads backfilled: {total_threads}")
     print(f"  Total messages archived: {total_messages}")
     print(f"  Date range: {cutoff_date.strftime('%Y-%m-%d')} to {datetime.now(timezone.utc).strftime('%Y-%m-%d')}")
     print("=" * 60)
+    print(memory_report(bot))
+    print(pool_report())
+    print(scheduler_report())
 
     # Close the bot after backfill is complete
     await bot.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill recent messages from every channel")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
     if not TOKEN:
         print("Error: DISCORD_TOKEN not found in .env file")
         exit(1)
 
     print("Starting Discord bot for bulk backfill...")
     print(f"This will fetch messages from the last {DAYS_TO_BACKFILL} days")
+    if LOW_MEMORY:
+        print("Low-memory profile enabled (bounded caches, no member chunking)")
     print()
 
-    bot.run(TOKEN)
+    run_profiled(profiler_from_args("backfill", args), lambda: bot.run(TOKEN))
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Distributed Backfill Worker
+Splits a backfill into per-channel work items stored in the database so
+several workers (on different hosts or bot tokens) can archive in parallel.
+Workers lease one channel at a time, heartbeat while they work and resume
+from the last checkpoint when a crashed worker's lease expires.
+
+Usage:
+  python backfill_worker.py enqueue [--days N | --full] [--guild ID] [--reset]
+  python backfill_worker.py work [--concurrency N] [--worker-id NAME]
+  python backfill_worker.py status
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+import discord
+from dotenv import load_dotenv
+
+from coordinator import (
+    HEARTBEAT_SECONDS,
+    claim_work_item,
+    complete_work_item,
+    enqueue_work_item,
+    heartbeat_work_item,
+    progress_report,
+    release_work_item,
+    remaining_work,
+)
+from db import MessageBatchWriter, pool_report, upsert_channel, upsert_guild
+from history import backfill_history
+from profiling import add_profile_arguments, profiler_from_args, run_profiled
+from runtime import RecentIds, make_bot
+from scheduler import BACKFILL, scheduler_report
+from threads import enumerate_threads, thread_parents
+
+load_dotenv()
+
+TOKEN = os.getenv("DISCORD_TOKEN")
+# Seconds an idle worker waits before checking the queue again
+POLL_SECONDS = 15
+
+
+async def enqueue(bot, args):
+    not_before = None if args.full else datetime.now(timezone.utc) - timedelta(days=args.days)
+    window = "full history" if not_before is None else f"since {not_before.strftime('%Y-%m-%d')}"
+    print(f"Enqueueing channels ({window})...")
+
+    total = 0
+    for guild in bot.guilds:
+        if args.guild and str(guild.id) not in args.guild:
+            continue
+        print(f"Processing guild: {guild.name} (ID: {guild.id})")
+        upsert_guild(guild)
+
+        parents = thread_parents(guild)
+        channels = [ch for ch in parents if isinstance(ch, discord.TextChannel)]
+        for forum in parents:
+            if isinstance(forum, discord.ForumChannel):
+                upsert_channel(forum)
+
+        threads = await enumerate_threads(guild, parents, cutoff=not_before)
+        for channel in channels + threads:
+            enqueue_work_item(channel, not_before, reset=args.reset)
+        print(f"  ✓ {len(channels)} channels and {len(threads)} threads queued")
+        total += len(channels) + len(threads)
+
+    print(f"Enqueued {total} work items")
+    print()
+    print(progress_report())
+
+
+def _as_utc(value):
+    # MySQL returns naive datetimes; Discord's are timezone-aware UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+async def process_item(bot, item, seen_users):
+    """Backfill one leased channel, heartbeating until it finishes."""
+    name = item["channelName"]
+    previous = item["messagesArchived"]
+    state = {"count": 0, "oldest_id": None}
+    writer = MessageBatchWriter()
+    resume = f" from message {item['cursorMessageId']}" if item["cursorMessageId"] else ""
+    print(f"▶ #{name} (attempt {item['attempts']}){resume}")
+
+    try:
+        channel = bot.get_channel(int(item["channelId"])) or await bot.fetch_channel(int(item["channelId"]))
+        upsert_guild(channel.guild)
+        upsert_channel(channel)
+
+        job = asyncio.create_task(
+            backfill_history(
+                channel, _as_utc(item["notBefore"]), writer, seen_users,
+                before=item["cursorMessageId"], state=state,
+            )
+        )
+        while True:
+            done, _ = await asyncio.wait({job}, timeout=HEARTBEAT_SECONDS)
+            if done:
+                break
+            # Only checkpoint messages that are actually in the database
+            writer.flush()
+            if not heartbeat_work_item(item, previous + state["count"], state["oldest_id"]):
+                print(f"✗ Lost lease on #{name}; another worker will take over")
+                job.cancel()
+                return
+        count = job.result()
+
+    except (discord.Forbidden, discord.NotFound) as e:
+        release_work_item(item, e, previous, None, permanent=True)
+        print(f"✗ #{name}: {e}")
+        return
+    except Exception as e:
+        writer.flush()
+        release_work_item(item, e, previous + state["count"], state["oldest_id"])
+        print(f"✗ #{name}: {e}")
+        return
+
+    complete_work_item(item, previous + count)
+    print(f"✓ #{name}: {count} messages")
+
+
+async def work(bot, args):
+    guild_ids = [str(g.id) for g in bot.guilds]
+    print(f"Worker {args.worker_id} serving {len(guild_ids)} guilds with {args.concurrency} slots")
+    seen_users = RecentIds()
+
+    async def slot():
+        while not bot.is_closed():
+            item = claim_work_item(args.worker_id, guild_ids)
+            if item:
+                await process_item(bot, item, seen_users)
+                continue
+            # Nothing claimable right now; stop once every channel is done,
+            # otherwise wait for leases held by other workers to finish or expire
+            if remaining_work(guild_ids) == 0:
+                return
+            await asyncio.sleep(POLL_SECONDS)
+
+    await asyncio.gather(*(slot() for _ in range(args.concurrency)))
+    print()
+    print(progress_report())
+    print(pool_report())
+    print(scheduler_report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed, resumable channel backfill")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = sub.add_parser("enqueue", help="Queue every channel and thread for backfill")
+    window = enqueue_parser.add_mutually_exclusive_group()
+    window.add_argument("--days", type=int, default=120, help="Archive messages from the last N days")
+    window.add_argument("--full", action="store_true", help="Archive the full history")
+    enqueue_parser.add_argument("--guild", action="append", help="Only this guild ID (repeatable)")
+    enqueue_parser.add_argument("--reset", action="store_true",
+                                help="Start already-queued channels over")
+
+    work_parser = sub.add_parser("work", help="Claim and backfill queued channels")
+    work_parser.add_argument("--concurrency", type=int, default=1,
+                             help="Channels this worker backfills at once")
+    work_parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}",
+                             help="Name shown in the progress report")
+    add_profile_arguments(work_parser)
+
+    sub.add_parser("status", help="Show queue progress and active leases")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(progress_report())
+        return
+
+    if not TOKEN:
+        print("Error: DISCORD_TOKEN not found in .env file")
+        exit(1)
+
+    bot = make_bot(priority=BACKFILL)
+
+    @bot.event
+    async def on_ready():
+        print(f"Logged in as {bot.user.name} (ID: {bot.user.id})")
+        print("------")
+        try:
+            if args.command == "enqueue":
+                await enqueue(bot, args)
+            else:
+                await work(bot, args)
+        finally:
+            await bot.close()
+
+    profiler = profiler_from_args("backfill-worker", args) if args.command == "work" else None
+    run_profiled(profiler, lambda: bot.run(TOKEN))
+
+
+if __name__ == "__main__":
+    main()
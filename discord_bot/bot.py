@@ -1,21 +1,22 @@
 # bot.py
+import argparse
 import os
-import json
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from db import upsert_user, upsert_guild, upsert_channel, insert_message, insert_attachments
+from db import upsert_user, upsert_guild, upsert_channel, insert_message, insert_attachments, pool_report
+from profiling import add_profile_arguments, profiler_from_args, run_profiled, stage
+from runtime import RecentIds, make_bot, start_memory_reporter
+from scheduler import LIVE, RECONCILIATION, request_priority, scheduler_report
+from serialize import build_raw_data
+from threads import thread_parents
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.guilds = True
-intents.members = True
-
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Command replies are live posts; catch-up reads drop to reconciliation below
+bot = make_bot(priority=LIVE)
 
 
 @bot.event
@@ -23,13 +24,17 @@ async def on_ready():
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
     print("------")
 
-    # Sync basic guild + channel info into DB
+    # Sync basic guild + channel info into DB, including forums and the
+    # active threads discord.py received with each guild
     for guild in bot.guilds:
         upsert_guild(guild)
-        for channel in guild.text_channels:
+        for channel in thread_parents(guild):
             upsert_channel(channel)
+        for thread in guild.threads:
+            upsert_channel(thread)
 
     print(f"Synced {len(bot.guilds)} guilds and their channels to database")
+    start_memory_reporter(bot, extra=[pool_report, scheduler_report])
 
 
 @bot.event
@@ -45,39 +50,12 @@ async def on_message(message: discord.Message):
     # Ensure related entities are in DB
     upsert_user(message.author)
     upsert_guild(message.guild)
-    if isinstance(message.channel, discord.TextChannel):
+    if isinstance(message.channel, (discord.TextChannel, discord.Thread)):
         upsert_channel(message.channel)
 
     # Insert message + attachments
-    # Create a serializable dictionary of message data
-    raw_data = {
-        "id": str(message.id),
-        "content": message.content,
-        "author": {
-            "id": str(message.author.id),
-            "name": message.author.name,
-            "discriminator": getattr(message.author, "discriminator", None),
-            "bot": message.author.bot,
-        },
-        "channel_id": str(message.channel.id),
-        "guild_id": str(message.guild.id) if message.guild else None,
-        "created_at": message.created_at.isoformat(),
-        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
-        "pinned": message.pinned,
-        "tts": message.tts,
-        "mention_everyone": message.mention_everyone,
-        "mentions": [str(u.id) for u in message.mentions],
-        "attachments": [
-            {
-                "id": str(a.id),
-                "filename": a.filename,
-                "url": a.url,
-                "size": a.size,
-                "content_type": a.content_type,
-            }
-            for a in message.attachments
-        ],
-    }
+    with stage("raw_data"):
+        raw_data = build_raw_data(message)
     insert_message(message, raw_data)
     insert_attachments(message)
 
@@ -93,53 +71,32 @@ async def backfill_channel(ctx, limit: int | None = None):
 
     channel = ctx.channel
     count = 0
+    seen_users = RecentIds()
+
+    with request_priority(RECONCILIATION):
+        async for msg in channel.history(limit=limit, oldest_first=True):
+            if msg.guild is None:
+                continue
+
+            if msg.author.id not in seen_users and upsert_user(msg.author):
+                seen_users.add(msg.author.id)
+            upsert_guild(msg.guild)
+            if isinstance(msg.channel, (discord.TextChannel, discord.Thread)):
+                upsert_channel(msg.channel)
 
-    async for msg in channel.history(limit=limit, oldest_first=True):
-        if msg.guild is None:
-            continue
-
-        upsert_user(msg.author)
-        upsert_guild(msg.guild)
-        if isinstance(msg.channel, discord.TextChannel):
-            upsert_channel(msg.channel)
-
-        # Create a serializable dictionary of message data
-        raw_data = {
-            "id": str(msg.id),
-            "content": msg.content,
-            "author": {
-                "id": str(msg.author.id),
-                "name": msg.author.name,
-                "discriminator": getattr(msg.author, "discriminator", None),
-                "bot": msg.author.bot,
-            },
-            "channel_id": str(msg.channel.id),
-            "guild_id": str(msg.guild.id) if msg.guild else None,
-            "created_at": msg.created_at.isoformat(),
-            "edited_at": msg.edited_at.isoformat() if msg.edited_at else None,
-            "pinned": msg.pinned,
-            "tts": msg.tts,
-            "mention_everyone": msg.mention_everyone,
-            "mentions": [str(u.id) for u in msg.mentions],
-            "attachments": [
-                {
-                    "id": str(a.id),
-                    "filename": a.filename,
-                    "url": a.url,
-                    "size": a.size,
-                    "content_type": a.content_type,
-                }
-                for a in msg.attachments
-            ],
-        }
-        insert_message(msg, raw_data)
-        insert_attachments(msg)
-        count += 1
-
-        if count % 1000 == 0:
-            print(f"Backfilled {count} messages in #{channel.name}")
+            insert_message(msg, build_raw_data(msg))
+            insert_attachments(msg)
+            count += 1
+
+            if count % 1000 == 0:
+                print(f"Backfilled {count} messages in #{channel.name}")
 
     await ctx.send(f"Backfill complete for #{ctx.channel.name}. Total: {count} messages.")
 
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive Discord messages to the database")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    run_profiled(profiler_from_args("bot", args), lambda: bot.run(TOKEN))
@@ -0,0 +1,290 @@
+# coordinator.py - Lease-based backfill work queue shared by backfill workers
+import os
+import uuid
+
+from mysql.connector import Error
+
+from db import get_connection
+
+# How long a claimed channel stays leased without a heartbeat
+LEASE_SECONDS = int(os.getenv("BACKFILL_LEASE_SECONDS", "300"))
+HEARTBEAT_SECONDS = int(os.getenv("BACKFILL_HEARTBEAT_SECONDS", "60"))
+# Claims per channel before it is marked failed
+MAX_ATTEMPTS = int(os.getenv("BACKFILL_MAX_ATTEMPTS", "5"))
+
+
+def enqueue_work_item(channel, not_before, reset=False):
+    """Add a channel or thread to the queue; reset=True starts it over."""
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        update = "channelName = VALUES(channelName)"
+        if reset:
+            update += """,
+                status = 'pending',
+                notBefore = VALUES(notBefore),
+                cursorMessageId = NULL,
+                messagesArchived = 0,
+                attempts = 0,
+                leaseOwner = NULL,
+                leaseToken = NULL,
+                leaseExpiresAt = NULL,
+                lastError = NULL"""
+        cursor.execute(
+            f"""
+            INSERT INTO backfill_work_items (channelId, guildId, channelName, notBefore)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE {update}
+            """,
+            (str(channel.id), str(channel.guild.id), channel.name, not_before),
+        )
+        conn.commit()
+    except Error as e:
+        print(f"❌ Error enqueueing channel {channel.id}: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def claim_work_item(owner, guild_ids):
+    """Lease the next pending (or abandoned) channel in one of guild_ids.
+
+    The claim is a single UPDATE evaluated against the database clock, so
+    workers on different hosts never both win the same row and their clock
+    skew does not matter. Returns the claimed row as a dict, or None.
+    """
+    if not guild_ids:
+        return None
+
+    conn = None
+    cursor = None
+    token = uuid.uuid4().hex
+    placeholders = ", ".join(["%s"] * len(guild_ids))
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        # Leases that expired on their last allowed attempt are given up on
+        cursor.execute(
+            """
+            UPDATE backfill_work_items
+            SET status = 'failed', leaseToken = NULL,
+                lastError = COALESCE(lastError, 'Lease expired too many times')
+            WHERE status = 'leased' AND leaseExpiresAt < NOW() AND attempts >= %s
+            """,
+            (MAX_ATTEMPTS,),
+        )
+
+        # backfill_work_items_claim_idx (status, guildId, createdAt) and
+        # _lease_expiry_idx keep this a range scan, so InnoDB only locks the
+        # candidate rows instead of the whole table while the claim sorts
+        cursor.execute(
+            f"""
+            UPDATE backfill_work_items
+            SET status = 'leased',
+                leaseOwner = %s,
+                leaseToken = %s,
+                leaseExpiresAt = NOW() + INTERVAL %s SECOND,
+                heartbeatAt = NOW(),
+                attempts = attempts + 1
+            WHERE guildId IN ({placeholders})
+              AND attempts < %s
+              AND (status = 'pending' OR (status = 'leased' AND leaseExpiresAt < NOW()))
+            ORDER BY createdAt, channelId
+            LIMIT 1
+            """,
+            (owner, token, LEASE_SECONDS, *guild_ids, MAX_ATTEMPTS),
+        )
+        claimed = cursor.rowcount
+        conn.commit()
+        if not claimed:
+            return None
+
+        cursor.execute("SELECT * FROM backfill_work_items WHERE leaseToken = %s", (token,))
+        return cursor.fetchone()
+    except Error as e:
+        print(f"❌ Error claiming backfill work: {e}")
+        if conn:
+            conn.rollback()
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def _update_leased(item, sql, params, action):
+    """Run an UPDATE guarded by the item's lease token; True if it still held."""
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            sql + " WHERE channelId = %s AND leaseToken = %s AND status = 'leased'",
+            (*params, item["channelId"], item["leaseToken"]),
+        )
+        held = cursor.rowcount == 1
+        conn.commit()
+        return held
+    except Error as e:
+        print(f"❌ Error {action} backfill of {item['channelId']}: {e}")
+        if conn:
+            conn.rollback()
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def heartbeat_work_item(item, messages_archived, cursor_message_id):
+    """Extend the lease and record progress. False means the lease was lost."""
+    return _update_leased(
+        item,
+        """
+        UPDATE backfill_work_items
+        SET leaseExpiresAt = NOW() + INTERVAL %s SECOND,
+            heartbeatAt = NOW(),
+            messagesArchived = %s,
+            cursorMessageId = COALESCE(%s, cursorMessageId)
+        """,
+        (LEASE_SECONDS, messages_archived, cursor_message_id),
+        "heartbeating",
+    )
+
+
+def complete_work_item(item, messages_archived):
+    return _update_leased(
+        item,
+        """
+        UPDATE backfill_work_items
+        SET status = 'done',
+            messagesArchived = %s,
+            leaseToken = NULL,
+            leaseExpiresAt = NULL,
+            heartbeatAt = NOW(),
+            lastError = NULL
+        """,
+        (messages_archived,),
+        "completing",
+    )
+
+
+def release_work_item(item, error, messages_archived, cursor_message_id, permanent=False):
+    """Hand a failed channel back to the queue, or fail it for good."""
+    return _update_leased(
+        item,
+        """
+        UPDATE backfill_work_items
+        SET status = IF(%s OR attempts >= %s, 'failed', 'pending'),
+            lastError = %s,
+            messagesArchived = %s,
+            cursorMessageId = COALESCE(%s, cursorMessageId),
+            leaseToken = NULL,
+            leaseExpiresAt = NULL
+        """,
+        (permanent, MAX_ATTEMPTS, str(error)[:1000], messages_archived, cursor_message_id),
+        "releasing",
+    )
+
+
+def remaining_work(guild_ids):
+    """Number of channels in guild_ids still pending or leased, or None on error."""
+    if not guild_ids:
+        return 0
+
+    conn = None
+    cursor = None
+    placeholders = ", ".join(["%s"] * len(guild_ids))
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT COUNT(*) FROM backfill_work_items
+            WHERE guildId IN ({placeholders}) AND status IN ('pending', 'leased')
+            """,
+            tuple(guild_ids),
+        )
+        return cursor.fetchone()[0]
+    except Error as e:
+        print(f"❌ Error counting backfill work: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def progress_report():
+    """Queue totals by status plus every active lease, as printable text."""
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT status, COUNT(*) AS channels, COALESCE(SUM(messagesArchived), 0) AS messages
+            FROM backfill_work_items
+            GROUP BY status
+            """
+        )
+        totals = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT channelName, leaseOwner, messagesArchived, attempts,
+                   TIMESTAMPDIFF(SECOND, heartbeatAt, NOW()) AS heartbeatAge,
+                   TIMESTAMPDIFF(SECOND, NOW(), leaseExpiresAt) AS expiresIn
+            FROM backfill_work_items
+            WHERE status = 'leased'
+            ORDER BY leaseOwner, channelName
+            """
+        )
+        leases = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT channelName, attempts, lastError
+            FROM backfill_work_items
+            WHERE status = 'failed'
+            ORDER BY updatedAt DESC
+            LIMIT 10
+            """
+        )
+        failures = cursor.fetchall()
+    except Error as e:
+        return f"❌ Error reading backfill progress: {e}"
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+    lines = ["Backfill queue:"]
+    for row in totals:
+        lines.append(f"  {row['status']:<8} {row['channels']:>6} channels {int(row['messages']):>10} messages")
+    if leases:
+        lines.append("")
+        lines.append("Active leases:")
+        for row in leases:
+            state = "expired" if row["expiresIn"] is not None and row["expiresIn"] < 0 else f"{row['expiresIn']}s left"
+            lines.append(
+                f"  {row['leaseOwner']:<32} #{row['channelName']} - {row['messagesArchived']} messages, "
+                f"attempt {row['attempts']}, heartbeat {row['heartbeatAge']}s ago ({state})"
+            )
+    if failures:
+        lines.append("")
+        lines.append("Recent failures:")
+        for row in failures:
+            lines.append(f"  #{row['channelName']} (attempts {row['attempts']}): {row['lastError']}")
+    return "\n".join(lines)
@@ -1,10 +1,16 @@
 # db.py - MySQL/TiDB version with improved connection handling
 import os
 import json
+import threading
 import mysql.connector
-from mysql.connector import Error, pooling
+from collections import deque
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
 from dotenv import load_dotenv
 from urllib.parse import urlparse
+from discord.utils import snowflake_time
+from derive import derive_mentions, derive_replies
+from profiling import record_stage, stage
 import time
 
 load_dotenv()
@@ -23,9 +29,6 @@ db_config = {
     'database': parsed.path.lstrip('/').split('?')[0],
     'connect_timeout': 30,
     'autocommit': False,
-    'pool_name': 'discord_bot_pool',
-    'pool_size': 5,
-    'pool_reset_session': True,
 }
 
 # TiDB Cloud requires SSL
@@ -35,38 +38,189 @@ if 'tidbcloud.com' in DATABASE_URL or 'ssl' in DATABASE_URL.lower():
     db_config['ssl_verify_cert'] = False  # Set to False to avoid certificate verification issues
     db_config['ssl_verify_identity'] = False
 
-# Create connection pool
-try:
-    connection_pool = pooling.MySQLConnectionPool(**db_config)
-    print(f"✅ Database connection pool created successfully")
-except Error as e:
-    print(f"❌ Error creating connection pool: {e}")
-    connection_pool = None
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections idle longer than this are pinged before being handed out
+POOL_IDLE_CHECK = float(os.getenv("DB_POOL_IDLE_CHECK", "30"))
+
+# Handed to a waiter when a slot frees up without a connection to reuse
+_NEW_CONNECTION = object()
+
+
+class PooledConnection:
+    """A checked-out connection; close() returns it to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._suspect = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def rollback(self):
+        # Callers roll back after errors, which may mean the link is broken,
+        # so have the pool check this connection before reusing it
+        self._suspect = True
+        try:
+            self._conn.rollback()
+        except Error:
+            pass
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn, self._suspect)
+
+
+class ConnectionPool:
+    """Fixed-size pool that queues callers instead of failing when exhausted.
+
+    Unlike mysql.connector's pool it does not ping on every checkout or
+    reset the session on every return, which against a remote TiDB over TLS
+    cost more than the statements themselves. Connections are only pinged
+    after sitting idle for idle_check seconds or after a caller rolled back.
+    Waiters are served first come, first served.
+    """
+
+    def __init__(self, config, size=POOL_SIZE, timeout=POOL_TIMEOUT, idle_check=POOL_IDLE_CHECK):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self._lock = threading.Lock()
+        self._idle = []  # (conn, last_used, suspect), most recently used last
+        self._waiters = deque()
+        self._open = 0
+        self._in_use = 0
+        self.stats = {
+            "checkouts": 0,
+            "waited": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "validations": 0,
+            "peak_in_use": 0,
+        }
+
+    def get_connection(self):
+        started = time.perf_counter()
+        waiter = None
+        with self._lock:
+            if self._idle and not self._waiters:
+                entry = self._idle.pop()
+            elif self._open < self.size:
+                self._open += 1
+                entry = _NEW_CONNECTION
+            else:
+                waiter = [threading.Event(), None]
+                self._waiters.append(waiter)
+
+        if waiter:
+            waiter[0].wait(self.timeout)
+            with self._lock:
+                if waiter[1] is None:
+                    self._waiters.remove(waiter)
+                    self.stats["timeouts"] += 1
+                    raise PoolError(
+                        f"No database connection free after {self.timeout:g}s "
+                        f"({self.size} in use)"
+                    )
+            entry = waiter[1]
+
+        waited = time.perf_counter() - started
+        record_stage("pool_wait", waited)
+
+        try:
+            if entry is _NEW_CONNECTION:
+                conn = mysql.connector.connect(**self.config)
+                validated = False
+            else:
+                conn, validated = self._validate(*entry)
+        except Exception:
+            if entry is not _NEW_CONNECTION:
+                # Free the dead connection's socket now rather than at garbage collection
+                try:
+                    entry[0].close()
+                except Exception:
+                    pass
+            self._discard()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            stats = self.stats
+            stats["checkouts"] += 1
+            stats["connects"] += entry is _NEW_CONNECTION
+            stats["validations"] += validated
+            stats["peak_in_use"] = max(stats["peak_in_use"], self._in_use)
+            if waiter:
+                stats["waited"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+        return PooledConnection(self, conn)
+
+    def _validate(self, conn, last_used, suspect):
+        if not suspect and time.monotonic() - last_used < self.idle_check:
+            return conn, False
+        conn.ping(reconnect=True, attempts=3, delay=1)
+        return conn, True
+
+    def release(self, conn, suspect=False):
+        # Only roll back if a transaction was left open; in_transaction is
+        # tracked client-side so this costs no round trip otherwise
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Error:
+            suspect = True
+
+        entry = (conn, time.monotonic(), suspect)
+        with self._lock:
+            self._in_use -= 1
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter[1] = entry
+                waiter[0].set()
+            else:
+                self._idle.append(entry)
+
+    def _discard(self):
+        """Give up a slot whose connection could not be opened or revived."""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter[1] = _NEW_CONNECTION
+                waiter[0].set()
+            else:
+                self._open -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(
+                self.stats,
+                size=self.size,
+                open=self._open,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                waiting=len(self._waiters),
+            )
+
+
+connection_pool = ConnectionPool(db_config)
+print(f"✅ Database connection pool ready (size {POOL_SIZE})")
 
 
 def get_connection(retries=3):
     """Get a connection from the pool with retry logic"""
     for attempt in range(retries):
         try:
-            if connection_pool:
-                conn = connection_pool.get_connection()
-                # Test the connection
-                conn.ping(reconnect=True, attempts=3, delay=1)
-                return conn
-            else:
-                # Fallback to direct connection if pool failed
-                conn = mysql.connector.connect(
-                    host=parsed.hostname,
-                    port=parsed.port or 3306,
-                    user=parsed.username,
-                    password=parsed.password,
-                    database=parsed.path.lstrip('/').split('?')[0],
-                    connect_timeout=30,
-                    ssl_disabled=False if 'tidbcloud.com' in DATABASE_URL else True,
-                    ssl_verify_cert=False,
-                    ssl_verify_identity=False,
-                )
-                return conn
+            return connection_pool.get_connection()
+        except PoolError:
+            # Every connection is busy; retrying would only wait longer
+            raise
         except Error as e:
             print(f"⚠️  Connection attempt {attempt + 1}/{retries} failed: {e}")
             if attempt < retries - 1:
@@ -75,36 +229,54 @@ def get_connection(retries=3):
                 raise
 
 
+def pool_report():
+    """One-line summary of connection pool usage and checkout wait times."""
+    s = connection_pool.snapshot()
+    avg_wait = s["wait_total"] / s["checkouts"] * 1000 if s["checkouts"] else 0.0
+    return (
+        f"DB pool: {s['in_use']}/{s['size']} in use (peak {s['peak_in_use']}), "
+        f"{s['idle']} idle, {s['waiting']} waiting | "
+        f"{s['checkouts']} checkouts, {s['waited']} waited, "
+        f"wait avg {avg_wait:.1f} ms max {s['wait_max'] * 1000:.1f} ms, "
+        f"{s['timeouts']} timeouts | {s['connects']} connects, {s['validations']} pings"
+    )
+
+
 def upsert_user(user):
+    """Insert or update a user; return True if the row was written."""
     conn = None
     cursor = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO discord_users (id, username, discriminator, globalName, bot, createdAt)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                username = VALUES(username),
-                discriminator = VALUES(discriminator),
-                globalName = VALUES(globalName),
-                bot = VALUES(bot)
-            """,
-            (
-                str(user.id),
-                user.name,
-                getattr(user, "discriminator", None),
-                getattr(user, "global_name", None),
-                1 if user.bot else 0,
-                user.created_at,
-            ),
-        )
-        conn.commit()
+        with stage("db_write"):
+            cursor.execute(
+                """
+                INSERT INTO discord_users (id, username, discriminator, globalName, bot, createdAt)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    username = VALUES(username),
+                    discriminator = VALUES(discriminator),
+                    globalName = VALUES(globalName),
+                    bot = VALUES(bot)
+                """,
+                (
+                    str(user.id),
+                    user.name,
+                    getattr(user, "discriminator", None),
+                    getattr(user, "global_name", None),
+                    1 if user.bot else 0,
+                    user.created_at,
+                ),
+            )
+        with stage("commit"):
+            conn.commit()
+        return True
     except Error as e:
         print(f"❌ Error upserting user {user.id}: {e}")
         if conn:
             conn.rollback()
+        return False
     finally:
         if cursor:
             cursor.close()
@@ -118,22 +290,24 @@ def upsert_guild(guild):
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO discord_guilds (id, name, iconUrl, createdAt)
-            VALUES (%s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                name = VALUES(name),
-                iconUrl = VALUES(iconUrl)
-            """,
-            (
-                str(guild.id),
-                guild.name,
-                str(guild.icon.url) if guild.icon else None,
-                guild.created_at,
-            ),
-        )
-        conn.commit()
+        with stage("db_write"):
+            cursor.execute(
+                """
+                INSERT INTO discord_guilds (id, name, iconUrl, createdAt)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    name = VALUES(name),
+                    iconUrl = VALUES(iconUrl)
+                """,
+                (
+                    str(guild.id),
+                    guild.name,
+                    str(guild.icon.url) if guild.icon else None,
+                    guild.created_at,
+                ),
+            )
+        with stage("commit"):
+            conn.commit()
     except Error as e:
         print(f"❌ Error upserting guild {guild.id}: {e}")
         if conn:
@@ -151,23 +325,29 @@ def upsert_channel(channel):
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO discord_channels (id, guildId, name, type, createdAt)
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                name = VALUES(name),
-                type = VALUES(type)
-            """,
-            (
-                str(channel.id),
-                str(channel.guild.id),
-                channel.name,
-                str(channel.type),
-                channel.created_at,
-            ),
-        )
-        conn.commit()
+        with stage("db_write"):
+            cursor.execute(
+                """
+                INSERT INTO discord_channels (id, guildId, name, type, parentId, createdAt)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    name = VALUES(name),
+                    type = VALUES(type),
+                    parentId = VALUES(parentId)
+                """,
+                (
+                    str(channel.id),
+                    str(channel.guild.id),
+                    channel.name,
+                    str(channel.type),
+                    # Threads and forum posts link back to their parent channel
+                    str(channel.parent_id) if getattr(channel, "parent_id", None) else None,
+                    # Threads created before 2022 have no created_at; fall back to the snowflake
+                    channel.created_at or snowflake_time(channel.id),
+                ),
+            )
+        with stage("commit"):
+            conn.commit()
     except Error as e:
         print(f"❌ Error upserting channel {channel.id}: {e}")
         if conn:
@@ -180,35 +360,19 @@ def upsert_channel(channel):
 
 
 def insert_message(message, raw_data):
+    """Insert a message with its derived mention rows in one transaction."""
     conn = None
     cursor = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO discord_messages (
-                id, channelId, guildId, authorId,
-                content, createdAt, editedAt,
-                isPinned, isTts, rawJson
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE id=id
-            """,
-            (
-                str(message.id),
-                str(message.channel.id),
-                str(message.guild.id),
-                str(message.author.id),
-                message.content,
-                message.created_at,
-                message.edited_at,
-                1 if message.pinned else 0,
-                1 if message.tts else 0,
-                json.dumps(raw_data),
-            ),
-        )
-        conn.commit()
+        with stage("db_write"):
+            cursor.execute(INSERT_MESSAGE_SQL, message_row(message, raw_data))
+            mentions = derive_mentions(str(message.id), raw_data)
+            if mentions:
+                cursor.executemany(INSERT_MENTION_SQL, mentions)
+        with stage("commit"):
+            conn.commit()
     except Error as e:
         print(f"❌ Error inserting message {message.id}: {e}")
         if conn:
@@ -230,24 +394,26 @@ def insert_attachments(message):
         conn = get_connection()
         cursor = conn.cursor()
         for a in message.attachments:
-            cursor.execute(
-                """
-                INSERT INTO discord_attachments (
-                    id, messageId, url, filename, contentType, sizeBytes
+            with stage("db_write"):
+                cursor.execute(
+                    """
+                    INSERT INTO discord_attachments (
+                        id, messageId, url, filename, contentType, sizeBytes
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE id=id
+                    """,
+                    (
+                        str(a.id),
+                        str(message.id),
+                        a.url,
+                        a.filename,
+                        a.content_type,
+                        a.size,
+                    ),
                 )
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE id=id
-                """,
-                (
-                    str(a.id),
-                    str(message.id),
-                    a.url,
-                    a.filename,
-                    a.content_type,
-                    a.size,
-                ),
-            )
-        conn.commit()
+        with stage("commit"):
+            conn.commit()
     except Error as e:
         print(f"❌ Error inserting attachments for message {message.id}: {e}")
         if conn:
@@ -257,3 +423,134 @@ def insert_attachments(message):
             cursor.close()
         if conn:
             conn.close()
+
+
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "200"))
+
+# Derived columns and tables (replyToMessageId, discord_message_mentions)
+# are filled here as messages are written, using the same derive.py
+# functions reingest.py runs over older rows
+INSERT_MESSAGE_SQL = """
+    INSERT INTO discord_messages (
+        id, channelId, guildId, authorId,
+        content, createdAt, editedAt,
+        isPinned, isTts, rawJson, replyToMessageId
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE replyToMessageId = COALESCE(replyToMessageId, VALUES(replyToMessageId))
+"""
+
+INSERT_MENTION_SQL = """
+    INSERT INTO discord_message_mentions (messageId, userId)
+    VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE userId = userId
+"""
+
+INSERT_ATTACHMENT_SQL = """
+    INSERT INTO discord_attachments (
+        id, messageId, url, filename, contentType, sizeBytes
+    )
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE id=id
+"""
+
+
+def message_row(message, raw_data):
+    """The INSERT_MESSAGE_SQL parameters for a message."""
+    replies = derive_replies(str(message.id), raw_data)
+    return (
+        str(message.id),
+        str(message.channel.id),
+        str(message.guild.id),
+        str(message.author.id),
+        message.content,
+        message.created_at,
+        message.edited_at,
+        1 if message.pinned else 0,
+        1 if message.tts else 0,
+        json.dumps(raw_data),
+        replies[0][1] if replies else None,
+    )
+
+
+class MessageBatchWriter:
+    """Buffer message and attachment rows and write them in batches.
+
+    Rows are stored as plain tuples so discord.py objects can be freed as
+    soon as they are added. Authors and channels must already be upserted.
+    """
+
+    def __init__(self, batch_size=MESSAGE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.messages = []
+        self.attachments = []
+        self.mentions = []
+        self.written = 0
+
+    def add(self, message, raw_data):
+        self.messages.append(message_row(message, raw_data))
+        self.mentions.extend(derive_mentions(str(message.id), raw_data))
+        for a in message.attachments:
+            self.attachments.append(
+                (str(a.id), str(message.id), a.url, a.filename, a.content_type, a.size)
+            )
+        if len(self.messages) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.messages:
+            return
+        messages, attachments, mentions = self.messages, self.attachments, self.mentions
+        self.messages, self.attachments, self.mentions = [], [], []
+
+        conn = None
+        cursor = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            with stage("db_write"):
+                cursor.executemany(INSERT_MESSAGE_SQL, messages)
+                if attachments:
+                    cursor.executemany(INSERT_ATTACHMENT_SQL, attachments)
+                if mentions:
+                    cursor.executemany(INSERT_MENTION_SQL, mentions)
+            with stage("commit"):
+                conn.commit()
+            self.written += len(messages)
+        except Error as e:
+            print(f"⚠️  Batch of {len(messages)} messages failed ({e}), retrying one by one")
+            if conn:
+                conn.rollback()
+            self._write_individually(conn, cursor, messages, attachments, mentions)
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+
+    def _write_individually(self, conn, cursor, messages, attachments, mentions):
+        if not conn or not cursor:
+            print(f"❌ Dropped {len(messages)} messages: no database connection")
+            return
+        for row in messages:
+            try:
+                cursor.execute(INSERT_MESSAGE_SQL, row)
+                conn.commit()
+                self.written += 1
+            except Error as e:
+                print(f"❌ Error inserting message {row[0]}: {e}")
+                conn.rollback()
+        for row in attachments:
+            try:
+                cursor.execute(INSERT_ATTACHMENT_SQL, row)
+                conn.commit()
+            except Error as e:
+                print(f"❌ Error inserting attachment {row[0]} for message {row[1]}: {e}")
+                conn.rollback()
+        for row in mentions:
+            try:
+                cursor.execute(INSERT_MENTION_SQL, row)
+                conn.commit()
+            except Error as e:
+                print(f"❌ Error inserting mention of {row[1]} in message {row[0]}: {e}")
+                conn.rollback()
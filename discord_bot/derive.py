@@ -0,0 +1,56 @@
+# derive.py - Pure functions deriving normalized rows from stored rawJson
+#
+# These run in reingest.py's worker processes, so this module must not
+# import db (or anything else that opens connections at import time).
+import json
+
+
+def derive_mentions(message_id, raw):
+    """(messageId, userId) rows for discord_message_mentions."""
+    return [(message_id, str(user_id)) for user_id in dict.fromkeys(raw.get("mentions") or [])]
+
+
+def derive_replies(message_id, raw):
+    """(messageId, replyToMessageId) for discord_messages.replyToMessageId."""
+    reference = raw.get("reference")
+    if reference and reference.get("message_id"):
+        return [(message_id, str(reference["message_id"]))]
+    return []
+
+
+def derive_attachments(message_id, raw):
+    """Rows for discord_attachments, in db.INSERT_ATTACHMENT_SQL column order."""
+    return [
+        (str(a["id"]), message_id, a["url"], a.get("filename"), a.get("content_type"), a.get("size"))
+        for a in raw.get("attachments") or []
+        if a.get("id") and a.get("url")
+    ]
+
+
+DERIVERS = {
+    "mentions": derive_mentions,
+    "replies": derive_replies,
+    "attachments": derive_attachments,
+}
+
+
+def derive_batch(rows, names):
+    """Parse a batch of (id, rawJson) rows and run the named derivers over it.
+
+    Returns ({name: [row, ...]}, errors) where errors lists message IDs whose
+    rawJson could not be parsed.
+    """
+    derivers = [(name, DERIVERS[name]) for name in names]
+    results = {name: [] for name in names}
+    errors = []
+    for message_id, raw_json in rows:
+        if not raw_json:
+            continue
+        try:
+            raw = json.loads(raw_json)
+        except ValueError:
+            errors.append(message_id)
+            continue
+        for name, derive in derivers:
+            results[name].extend(derive(message_id, raw))
+    return results, errors
@@ -0,0 +1,57 @@
+# history.py - Stream a channel's message history into the database
+import discord
+
+from db import upsert_user
+from profiling import stage, timed_iter
+from serialize import build_raw_data
+
+
+async def backfill_history(channel, cutoff_date, writer, seen_users, progress=False,
+                           before=None, state=None):
+    """Write every message in channel newer than cutoff_date; return the count.
+
+    cutoff_date=None archives the full history. before resumes from a
+    message ID (exclusive). If state is a dict, its "count" and "oldest_id"
+    keys are kept up to date so a caller can checkpoint progress after
+    flushing the writer. Fetches are paced by the bot's REST scheduler.
+    """
+    count = 0
+    if before is not None:
+        before = discord.Object(id=int(before))
+
+    # Fetch messages from newest to oldest until we hit the cutoff date.
+    # Only the awaited fetches are timed, so this loop's own DB writes and
+    # raw_data builds are not counted as discord_fetch as well
+    history = channel.history(limit=None, before=before, oldest_first=False)
+    async for message in timed_iter(history, "discord_fetch"):
+        # Stop if message is older than cutoff date
+        if cutoff_date and message.created_at < cutoff_date:
+            break
+
+        # Skip messages without a guild (shouldn't happen in guild channels)
+        if message.guild is None:
+            continue
+
+        # Skip the author upsert if it was written recently; a failed upsert
+        # is retried on the next message since the author's messages would
+        # otherwise fail the authorId foreign key
+        if message.author.id not in seen_users and upsert_user(message.author):
+            seen_users.add(message.author.id)
+
+        # The writer copies out plain rows, so nothing keeps a reference to
+        # the message once the next one arrives
+        with stage("raw_data"):
+            raw_data = build_raw_data(message)
+        writer.add(message, raw_data)
+
+        count += 1
+        if state is not None:
+            state["count"] = count
+            state["oldest_id"] = str(message.id)
+
+        # Progress indicator every 100 messages
+        if progress and count % 100 == 0:
+            print(f"{count}...", end=" ", flush=True)
+
+    writer.flush()
+    return count
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Meeting to Client Channel Matcher
+Links Read.ai meetings to client Discord channels using in-memory indexes of
+client_mappings (emails, email domains, contact and channel names) instead
+of LIKE scans, and writes meetings.matchedChannelId and matchConfidence in
+bulk.
+
+By default only meetings the matcher has never evaluated are processed
+(run it on a schedule); --backfill re-evaluates every meeting, e.g. after
+uploading new client mappings.
+
+Usage: python match_meetings.py [--backfill] [--overwrite] [--min-confidence 50] [--dry-run]
+"""
+
+import argparse
+import sys
+import time
+
+from mysql.connector import Error
+
+from db import get_connection
+from meeting_matcher import ClientIndex, parse_participants
+
+
+def load_index():
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT contactName, contactEmail, discordChannelName, discordChannelId, clientName
+            FROM client_mappings
+            """
+        )
+        mappings = cursor.fetchall()
+        cursor.execute("SELECT id, name FROM discord_channels")
+        channels = [(row["id"], row["name"]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+    return ClientIndex.build(mappings, channels), len(mappings)
+
+
+def read_meetings(cursor, after_id, size, backfill):
+    cursor.execute(
+        f"""
+        SELECT id, title, participants, matchedChannelId FROM meetings
+        WHERE id > %s {"" if backfill else "AND matchedAt IS NULL"}
+        ORDER BY id
+        LIMIT %s
+        """,
+        (after_id, size),
+    )
+    return cursor.fetchall()
+
+
+def write_matches(conn, rows):
+    """Write (id, channelId, confidence, method) rows in one UPDATE ... JOIN.
+
+    Rows with channelId None only record that the meeting was evaluated.
+    """
+    if not rows:
+        return
+    values = " UNION ALL ".join(["SELECT %s AS id, %s AS channelId, %s AS confidence, %s AS method"] * len(rows))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            UPDATE meetings m
+            JOIN ({values}) v ON m.id = v.id
+            SET m.matchedChannelId = COALESCE(v.channelId, m.matchedChannelId),
+                m.matchConfidence = IF(v.channelId IS NULL, m.matchConfidence, v.confidence),
+                m.matchMethod = IF(v.channelId IS NULL, m.matchMethod, v.method),
+                m.matchedAt = NOW()
+            """,
+            [item for row in rows for item in row],
+        )
+        conn.commit()
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match Read.ai meetings to client Discord channels")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Re-evaluate every meeting, not just new ones")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Replace existing matches (default: only fill unmatched meetings)")
+    parser.add_argument("--min-confidence", type=int, default=50,
+                        help="Lowest confidence (0-100) that counts as a match")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Meetings per read/write batch")
+    parser.add_argument("--dry-run", action="store_true", help="Print matches without writing them")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    try:
+        index, mapping_count = load_index()
+    except Error as e:
+        print(f"❌ Error loading client mappings: {e}")
+        sys.exit(1)
+    print(f"Indexed {mapping_count} client mappings in {time.monotonic() - started:.2f}s "
+          f"({len(index.emails)} emails, {len(index.domains)} domains, "
+          f"{len(index.contact_names)} contact names, {len(index.title_names)} client/channel names)")
+
+    reader = get_connection()
+    writer = get_connection()
+    read_cursor = reader.cursor(dictionary=True)
+    evaluated = 0
+    matched = 0
+    by_method = {}
+    after_id = 0
+    try:
+        while True:
+            meetings = read_meetings(read_cursor, after_id, args.batch_size, args.backfill)
+            reader.commit()
+            if not meetings:
+                break
+            after_id = meetings[-1]["id"]
+
+            updates = []
+            for meeting in meetings:
+                result = index.match(parse_participants(meeting["participants"]), meeting["title"])
+                if result and result[1] >= args.min_confidence and (
+                    args.overwrite or not meeting["matchedChannelId"]
+                ):
+                    channel_id, confidence, method = result
+                    updates.append((meeting["id"], channel_id, confidence, method))
+                    matched += 1
+                    by_method[method] = by_method.get(method, 0) + 1
+                    if args.dry_run:
+                        print(f"  {meeting['id']}: {meeting['title']!r} -> {channel_id} ({method}, {confidence})")
+                else:
+                    updates.append((meeting["id"], None, None, None))
+            evaluated += len(meetings)
+
+            if not args.dry_run:
+                write_matches(writer, updates)
+            print(f"  {evaluated} meetings evaluated, {matched} matched")
+    except Error as e:
+        print(f"❌ Database error: {e}")
+        sys.exit(1)
+    finally:
+        read_cursor.close()
+        reader.close()
+        writer.close()
+
+    print("=" * 60)
+    print(f"Meeting matching complete{' (dry run)' if args.dry_run else ''}!")
+    print(f"  Meetings evaluated: {evaluated}")
+    print(f"  Meetings matched: {matched}")
+    for method, count in sorted(by_method.items(), key=lambda item: -item[1]):
+        print(f"    by {method}: {count}")
+    print(f"  Time: {time.monotonic() - started:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
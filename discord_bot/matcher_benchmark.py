@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Meeting Matcher Benchmark
+Times meeting_matcher.ClientIndex on synthetic client mappings and meetings
+(no database or Discord connection needed), and compares it with a naive
+substring scan over every mapping, the in-Python equivalent of the LIKE
+'%...%' queries.
+
+Usage: python matcher_benchmark.py [--clients 2000] [--meetings 50000] [--naive-sample 500]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from meeting_matcher import ClientIndex, parse_participants
+
+FIRST = ["alex", "sam", "jordan", "casey", "morgan", "taylor", "riley", "jamie", "drew", "avery"]
+LAST = ["smith", "garcia", "nguyen", "patel", "kim", "brown", "lopez", "miller", "davis", "wilson"]
+WORDS = ["acme", "summit", "harbor", "pioneer", "granite", "cedar", "bright", "north", "blue", "iron"]
+INDUSTRY = ["roofing", "dental", "legal", "logistics", "plumbing", "fitness", "realty", "solar"]
+
+
+def make_mappings(clients, contacts, rng):
+    mappings = []
+    for i in range(clients):
+        client = f"{rng.choice(WORDS)} {rng.choice(INDUSTRY)} {i}"
+        domain = f"{client.replace(' ', '')}.com"
+        for _ in range(contacts):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            mappings.append({
+                "contactName": f"{first.title()} {last.title()} {i}",
+                "contactEmail": f"{first}.{last}@{domain}",
+                "discordChannelName": f"client-{client.replace(' ', '-')}",
+                "discordChannelId": str(100000 + i),
+                "clientName": client.title(),
+            })
+    return mappings
+
+
+def make_meetings(count, mappings, rng):
+    meetings = []
+    for _ in range(count):
+        participants = []
+        for _ in range(rng.randint(2, 8)):
+            roll = rng.random()
+            if roll < 0.4:
+                m = rng.choice(mappings)
+                participants.append({"name": m["contactName"], "email": m["contactEmail"]})
+            elif roll < 0.6:
+                m = rng.choice(mappings)
+                participants.append({"name": "New Person", "email": f"new@{m['contactEmail'].split('@')[1]}"})
+            else:
+                participants.append({"name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+                                     "email": f"someone{rng.randint(0, 10**6)}@gmail.com"})
+        title = rng.choice(["Weekly sync", "Kickoff", "Strategy call", "Quarterly review"])
+        if rng.random() < 0.3:
+            title += f" - {rng.choice(mappings)['clientName']}"
+        meetings.append({"title": title, "participants": json.dumps(participants)})
+    return meetings
+
+
+def naive_match(meeting, mappings):
+    """Substring-scan every mapping, like LIKE '%email%' / '%name%' queries."""
+    participants = meeting["participants"].lower()
+    title = meeting["title"].lower()
+    for m in mappings:
+        if m["contactEmail"] in participants or m["contactName"].lower() in participants:
+            return m["discordChannelId"]
+        if m["clientName"].lower() in title:
+            return m["discordChannelId"]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indexed meeting matcher")
+    parser.add_argument("--clients", type=int, default=2000, help="Synthetic clients")
+    parser.add_argument("--contacts", type=int, default=3, help="Contacts per client")
+    parser.add_argument("--meetings", type=int, default=50000, help="Synthetic meetings to match")
+    parser.add_argument("--naive-sample", type=int, default=500,
+                        help="Meetings to time with the naive scan (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mappings = make_mappings(args.clients, args.contacts, rng)
+    meetings = make_meetings(args.meetings, mappings, rng)
+    print(f"Generated {len(mappings)} mappings and {len(meetings)} meetings")
+
+    started = time.perf_counter()
+    index = ClientIndex.build(mappings)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matched = 0
+    by_method = {}
+    for meeting in meetings:
+        result = index.match(parse_participants(meeting["participants"]), meeting["title"])
+        if result:
+            matched += 1
+            by_method[result[2]] = by_method.get(result[2], 0) + 1
+    match_time = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"Index build: {build_time * 1000:.1f} ms")
+    print(f"Indexed match: {len(meetings)} meetings in {match_time:.2f}s "
+          f"({len(meetings) / match_time:,.0f} meetings/s, {match_time / len(meetings) * 1e6:.1f} µs each)")
+    print(f"  Matched: {matched} ({matched / len(meetings):.0%})")
+    for method, count in sorted(by_method.items(), key=lambda item: -item[1]):
+        print(f"    by {method}: {count}")
+
+    if args.naive_sample:
+        sample = meetings[:args.naive_sample]
+        started = time.perf_counter()
+        for meeting in sample:
+            naive_match(meeting, mappings)
+        naive_time = time.perf_counter() - started
+        per_meeting = naive_time / len(sample)
+        print(f"Naive scan: {len(sample)} meetings in {naive_time:.2f}s "
+              f"({per_meeting * 1e6:.0f} µs each, ~{per_meeting * len(meetings):.0f}s for all {len(meetings)})")
+        print(f"  Speedup: {per_meeting / (match_time / len(meetings)):,.0f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
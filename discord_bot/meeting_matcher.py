@@ -0,0 +1,187 @@
+# meeting_matcher.py - In-memory indexes matching Read.ai meetings to client channels
+#
+# Pure Python with no database access, so match_meetings.py and
+# matcher_benchmark.py can share it.
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+
+# Confidence (0-100) of each kind of evidence. A domain or name only counts
+# when it points at a single channel; an email shared by several channels
+# counts for each of them at AMBIGUOUS_EMAIL.
+EMAIL = 100
+AMBIGUOUS_EMAIL = 60
+DOMAIN = 70
+CONTACT_NAME = 60
+TITLE = 50
+# Added when two or more different kinds of evidence agree on a channel
+AGREEMENT_BONUS = 10
+
+# Shared mailbox providers say nothing about which client someone works for
+FREE_EMAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "hotmail.com", "outlook.com",
+    "live.com", "msn.com", "icloud.com", "me.com", "aol.com", "protonmail.com",
+    "proton.me", "gmx.com", "comcast.net", "att.net", "verizon.net",
+}
+# Our own domains (comma-separated), e.g. the account managers on every call
+IGNORE_DOMAINS = {
+    d.strip().lower() for d in os.getenv("MATCHER_IGNORE_DOMAINS", "").split(",") if d.strip()
+}
+
+# Names shorter than this are too likely to appear in unrelated titles
+MIN_TITLE_NAME_LENGTH = 4
+MAX_TITLE_NAME_TOKENS = 6
+# Dropped from client and channel names before indexing
+NAME_NOISE = {"llc", "inc", "co", "corp", "ltd", "the", "client", "archived"}
+
+_EMAIL_RE = re.compile(r"[\w.+'-]+@[\w-]+(?:\.[\w-]+)+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation: 'Acmé-Roofing, LLC' -> 'acme roofing llc'."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM_RE.sub(" ", text.lower()).strip()
+
+
+def name_tokens(text):
+    return tuple(t for t in normalize(text).split() if t not in NAME_NOISE)
+
+
+def email_domain(email):
+    return email.rsplit("@", 1)[-1].lower() if email and "@" in email else None
+
+
+def parse_participants(value):
+    """Return [(name, email)] from a meetings.participants value.
+
+    The webhook stores a JSON array of strings or {name, email} objects;
+    the CSV import stores a comma-separated string.
+    """
+    if not value:
+        return []
+    try:
+        items = json.loads(value)
+        if not isinstance(items, list):
+            items = [items]
+    except ValueError:
+        items = value.split(",")
+
+    participants = []
+    for item in items:
+        if isinstance(item, dict):
+            participants.append((item.get("name") or "", (item.get("email") or "").lower() or None))
+        elif isinstance(item, str):
+            found = _EMAIL_RE.search(item)
+            email = found.group(0).lower() if found else None
+            name = _EMAIL_RE.sub("", item).strip(" <>()\"'") if found else item.strip()
+            participants.append((name, email))
+    return participants
+
+
+class ClientIndex:
+    """Hash indexes over client_mappings built once, then probed per participant."""
+
+    def __init__(self):
+        self.emails = defaultdict(set)
+        self.domains = defaultdict(set)
+        self.contact_names = defaultdict(set)
+        self.title_names = defaultdict(set)
+        self.max_title_tokens = 1
+
+    @classmethod
+    def build(cls, mappings, channels=()):
+        """Build from client_mappings rows (dicts) and (id, name) discord_channels rows.
+
+        Mappings that only have a discordChannelName are resolved through the
+        channel list; other channels are not indexed, so names like #general
+        never match a meeting title.
+        """
+        index = cls()
+        channel_ids = {}
+        for channel_id, name in channels:
+            channel_ids.setdefault(normalize(name), str(channel_id))
+
+        for m in mappings:
+            channel_id = m.get("discordChannelId") or channel_ids.get(normalize(m.get("discordChannelName")))
+            if not channel_id:
+                continue
+            channel_id = str(channel_id)
+
+            email = (m.get("contactEmail") or "").strip().lower()
+            if email:
+                index.emails[email].add(channel_id)
+                domain = email_domain(email)
+                if domain and domain not in FREE_EMAIL_DOMAINS and domain not in IGNORE_DOMAINS:
+                    index.domains[domain].add(channel_id)
+
+            contact = name_tokens(m.get("contactName"))
+            if contact:
+                index.contact_names[contact].add(channel_id)
+
+            for name in (m.get("clientName"), m.get("discordChannelName")):
+                index._add_title_name(name, channel_id)
+        return index
+
+    def _add_title_name(self, name, channel_id):
+        tokens = name_tokens(name)
+        if tokens and len(tokens) <= MAX_TITLE_NAME_TOKENS and len(" ".join(tokens)) >= MIN_TITLE_NAME_LENGTH:
+            self.title_names[tokens].add(channel_id)
+            self.max_title_tokens = max(self.max_title_tokens, len(tokens))
+
+    def match(self, participants, title=None):
+        """Return (channelId, confidence, method) for the best channel, or None.
+
+        Cost is O(participants + title tokens): each participant is a few
+        dictionary lookups and the title is probed by short token windows.
+        """
+        evidence = defaultdict(dict)  # channel -> {method: confidence}
+
+        def add(channels, method, confidence):
+            for channel_id in channels:
+                best = evidence[channel_id]
+                best[method] = max(best.get(method, 0), confidence)
+
+        for name, email in participants:
+            if email:
+                channels = self.emails.get(email)
+                if channels:
+                    add(channels, "email", EMAIL if len(channels) == 1 else AMBIGUOUS_EMAIL)
+                channels = self.domains.get(email_domain(email))
+                if channels and len(channels) == 1:
+                    add(channels, "domain", DOMAIN)
+            tokens = name_tokens(name)
+            if tokens:
+                channels = self.contact_names.get(tokens)
+                if channels and len(channels) == 1:
+                    add(channels, "contact_name", CONTACT_NAME)
+
+        if title and self.title_names:
+            tokens = name_tokens(title)
+            for start in range(len(tokens)):
+                for size in range(1, min(self.max_title_tokens, len(tokens) - start) + 1):
+                    channels = self.title_names.get(tokens[start:start + size])
+                    if channels and len(channels) == 1:
+                        add(channels, "title", TITLE)
+
+        best = None
+        runner_up = 0
+        for channel_id, methods in evidence.items():
+            method = max(methods, key=methods.get)
+            confidence = methods[method]
+            if len(methods) > 1:
+                confidence = min(100, confidence + AGREEMENT_BONUS)
+            if best is None or confidence > best[1]:
+                runner_up = best[1] if best else 0
+                best = (channel_id, confidence, method)
+            else:
+                runner_up = max(runner_up, confidence)
+
+        # Two channels with equally strong evidence is not a match
+        if best is None or best[1] == runner_up:
+            return None
+        return best
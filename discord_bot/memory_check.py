@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Memory Regression Check
+Builds the bot with make_bot() and feeds discord.py's connection state
+synthetic GUILD_CREATE, GUILD_MEMBERS_CHUNK, GUILD_MEMBER_ADD and
+MESSAGE_CREATE payloads, with an on_message listener running the archiving
+pipeline. Checks that with LOW_MEMORY=1 the memory the bot keeps, its
+member cache and its message cache stay flat as the guild grows, and
+reports the same numbers for the default profile for comparison.
+
+Usage: python memory_check.py [--members 50000] [--messages 20000] [--budget-mb 8]
+                              [--profile low-memory|default|both]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+# feed() drives discord.py's private ConnectionState parsers and chunking
+# internals, which change between releases; requirements.txt pins the version
+if not discord.__version__.startswith("2.4."):
+    sys.exit(f"❌ memory_check.py is written against discord.py 2.4 internals, found "
+             f"{discord.__version__}; update feed() for the new version before trusting its results")
+
+from discord.state import ChunkRequest
+
+import runtime
+from runtime import USER_CACHE_SIZE, RecentIds, peak_rss_bytes, rss_bytes
+from serialize import build_raw_data
+
+GUILD_ID = 100000000000000000
+CHANNEL_ID = 300000000000000000
+MEMBER_ID = 200000000000000000
+MESSAGE_ID = 400000000000000000
+CHUNK_SIZE = 1000
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def user_payload(i):
+    return {
+        "id": str(MEMBER_ID + i),
+        "username": f"member-{i}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": False,
+    }
+
+
+def member_payload(i):
+    return {
+        "user": user_payload(i),
+        "roles": [],
+        "joined_at": START.isoformat(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def guild_create_payload(member_count):
+    return {
+        "id": str(GUILD_ID),
+        "name": "Synthetic Guild",
+        "owner_id": str(MEMBER_ID),
+        "member_count": member_count,
+        "large": True,
+        "roles": [{
+            "id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False,
+        }],
+        "channels": [{
+            "id": str(CHANNEL_ID), "type": 0, "name": "general", "position": 0,
+            "permission_overwrites": [], "guild_id": str(GUILD_ID),
+        }],
+        "members": [],
+        "threads": [],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+    }
+
+
+def member_chunks(member_count, nonce):
+    """GUILD_MEMBERS_CHUNK payloads, as chunking the guild at startup delivers them."""
+    chunk_count = (member_count + CHUNK_SIZE - 1) // CHUNK_SIZE
+    for index in range(chunk_count):
+        yield {
+            "guild_id": str(GUILD_ID),
+            "members": [member_payload(i) for i in range(index * CHUNK_SIZE,
+                                                         min((index + 1) * CHUNK_SIZE, member_count))],
+            "chunk_index": index,
+            "chunk_count": chunk_count,
+            "nonce": nonce,
+        }
+
+
+def message_payload(i, author, mentioned, rng):
+    return {
+        "id": str(MESSAGE_ID + i),
+        "type": 0,
+        "channel_id": str(CHANNEL_ID),
+        "guild_id": str(GUILD_ID),
+        "author": user_payload(author),
+        "member": {"roles": [], "joined_at": START.isoformat(), "deaf": False, "mute": False, "flags": 0},
+        "content": f"synthetic message {i} " + "x" * rng.randrange(0, 400),
+        "timestamp": (START + timedelta(seconds=i)).isoformat(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [user_payload(mentioned)] if mentioned is not None else [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+    }
+
+
+async def feed(bot, member_count, message_count, seed):
+    """Stream a guild of member_count members and message_count messages into bot."""
+    rng = random.Random(seed)
+    state = bot._connection
+
+    # Guilds arrive while READY is being processed, so chunking (when the
+    # profile allows it) follows the startup path rather than GUILD_CREATE's
+    state._ready_state = asyncio.Queue()
+    state.parse_guild_create(guild_create_payload(member_count))
+    del state._ready_state
+    guild = bot.get_guild(GUILD_ID)
+
+    if state._chunk_guilds:
+        request = ChunkRequest(GUILD_ID, guild.shard_id, asyncio.get_running_loop(), state._get_guild,
+                               cache=state.member_cache_flags.joined)
+        state._chunk_requests[GUILD_ID] = request
+        for chunk in member_chunks(member_count, request.nonce):
+            state.parse_guild_members_chunk(chunk)
+
+    joined = member_count
+    for i in range(message_count):
+        # A member joins every 20 messages
+        if i % 20 == 0:
+            payload = member_payload(joined)
+            payload["guild_id"] = str(GUILD_ID)
+            state.parse_guild_member_add(payload)
+            joined += 1
+        mentioned = rng.randrange(member_count) if i % 10 == 0 else None
+        state.parse_message_create(message_payload(i, rng.randrange(member_count), mentioned, rng))
+        # Let the dispatched on_message handlers run
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    return guild
+
+
+async def measure(low_memory, member_count, message_count, seed):
+    """Memory the bot retains after streaming the synthetic guild, plus cache sizes."""
+    runtime.LOW_MEMORY = low_memory
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    bot = runtime.make_bot()
+    # What login() does first: bind the client to the running loop
+    await bot._async_setup_hook()
+    seen_users = RecentIds(USER_CACHE_SIZE)
+    rows = 0
+
+    @bot.listen("on_message")
+    async def archive(message):
+        # The in-process part of bot.py's on_message, with the DB writes replaced by a count
+        nonlocal rows
+        if message.author.id not in seen_users:
+            seen_users.add(message.author.id)
+            rows += 1
+        json.dumps(build_raw_data(message))
+        rows += 1
+
+    guild = await feed(bot, member_count, message_count, seed)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "retained": retained - before,
+        "peak": peak - before,
+        "members": len(guild.members),
+        "messages": len(bot.cached_messages),
+        "max_messages": bot._connection.max_messages,
+        "users": len(bot.users),
+        "rows": rows,
+        "author_cache": len(seen_users),
+    }
+    await bot.close()
+    return result
+
+
+def _mb(value):
+    return f"{value / (1024 * 1024):.1f} MB"
+
+
+def check(name, low_memory, sizes, args):
+    """Measure one profile at each guild size; return True if it stayed flat."""
+    print(f"Profile: {name}")
+    results = []
+    for members in sizes:
+        r = asyncio.run(measure(low_memory, members, args.messages, args.seed))
+        results.append(r)
+        print(f"  {members:>7} members: retained {_mb(r['retained'])} (peak {_mb(r['peak'])}), "
+              f"{r['members']} cached members, {r['users']} users, "
+              f"{r['messages']}/{r['max_messages']} cached messages, {r['rows']} rows written")
+
+    small, large = results
+    growth = (large["retained"] - small["retained"]) / (1024 * 1024)
+    member_growth = large["members"] - small["members"]
+    print(f"  Growth from {sizes[0]} to {sizes[1]} members: {growth:.2f} MB, "
+          f"{member_growth} cached members (budget {args.budget_mb} MB)")
+
+    failures = []
+    if growth > args.budget_mb:
+        failures.append("retained memory grew with the guild")
+    if large["members"] > small["members"] + args.messages // 20 + 1:
+        failures.append("member cache grew with the guild")
+    if large["max_messages"] is not None and large["messages"] > large["max_messages"]:
+        failures.append("message cache exceeded its limit")
+    if low_memory and large["messages"] > runtime.MESSAGE_CACHE_SIZE:
+        failures.append(f"message cache is larger than MESSAGE_CACHE_SIZE ({runtime.MESSAGE_CACHE_SIZE})")
+    for failure in failures:
+        print(f"  ✗ {failure}")
+    if not failures:
+        print("  ✓ Stayed flat")
+    print()
+    return not failures, growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=50000, help="Synthetic guild member count")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages to stream")
+    parser.add_argument("--budget-mb", type=float, default=8.0,
+                        help="Allowed growth in retained memory between the small and full guild")
+    parser.add_argument("--profile", choices=["low-memory", "default", "both"], default="both",
+                        help="Profile(s) to check; the run fails if a checked profile grows "
+                             "(with 'both', only the low-memory profile has to stay flat)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = (max(args.members // 10, 1), args.members)
+    print(f"Synthetic guild: {sizes[0]} and {sizes[1]} members, {args.messages} messages each")
+    print()
+
+    ok = True
+    growth = {}
+    if args.profile in ("low-memory", "both"):
+        passed, growth["low-memory"] = check("low-memory (LOW_MEMORY=1)", True, sizes, args)
+        ok = ok and passed
+    if args.profile in ("default", "both"):
+        passed, growth["default"] = check("default (LOW_MEMORY=0)", False, sizes, args)
+        if args.profile == "default":
+            ok = passed
+    if len(growth) == 2:
+        print(f"Low-memory profile saves {growth['default'] - growth['low-memory']:.1f} MB "
+              f"of growth for {sizes[1] - sizes[0]} extra members")
+        if growth["default"] <= args.budget_mb:
+            print("⚠️  The default profile stayed within budget too; raise --members so the "
+                  "check can tell the profiles apart")
+
+    rss, peak_rss = rss_bytes(), peak_rss_bytes()
+    if rss is not None:
+        print(f"RSS: {_mb(rss)}")
+    if peak_rss is not None:
+        print(f"Peak RSS: {_mb(peak_rss)}")
+
+    if not ok:
+        print("✗ Memory grew beyond budget")
+        sys.exit(1)
+    print("✓ Memory stayed within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,9 +14,11 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 import discord
-from discord.ext import commands
 from dotenv import load_dotenv
 
+from runtime import make_bot
+from scheduler import LIVE
+
 # Load environment variables
 load_dotenv()
 
@@ -25,10 +27,9 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 async def post_meeting_summary(meeting_data):
     """Post a meeting summary to a Discord channel"""
     
-    # Create bot with minimal intents
-    intents = discord.Intents.default()
-    intents.message_content = True
-    bot = commands.Bot(command_prefix="!", intents=intents)
+    # Create bot with minimal intents; summaries are time-sensitive, so its
+    # requests go ahead of any backfill running on the same token
+    bot = make_bot(members=False, priority=LIVE)
     
     @bot.event
     async def on_ready():
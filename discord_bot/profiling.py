@@ -0,0 +1,291 @@
+# profiling.py - Built-in --profile mode shared by the bot scripts
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+
+class _Stage:
+    """Times one pass through a pipeline stage (see stage())."""
+
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageTimings:
+    """Count, total and max seconds spent in each named stage."""
+
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self.lock:
+            count, total, worst = self.stats.get(name, (0, 0.0, 0.0))
+            self.stats[name] = (count + 1, total + seconds, max(worst, seconds))
+
+    def report(self):
+        with self.lock:
+            stats = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [f"{'stage':<16} {'count':>10} {'total s':>10} {'avg ms':>10} {'max ms':>10}"]
+        for name, (count, total, worst) in stats:
+            lines.append(
+                f"{name:<16} {count:>10} {total:>10.2f} {total / count * 1000:>10.2f} {worst * 1000:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+# Set while a Profiler is running; stage() is a no-op otherwise
+_timings = None
+
+
+def stage(name):
+    """Context manager timing a pipeline stage when --profile is on.
+
+    Stages used by the scripts: discord_fetch, rest_queue, raw_data,
+    pool_wait, db_write, commit.
+    """
+    if _timings is None:
+        return _NULL_STAGE
+    return _Stage(_timings, name)
+
+
+def record_stage(name, seconds):
+    """Record a stage duration measured by the caller (e.g. around an async for)."""
+    if _timings is not None:
+        _timings.record(name, seconds)
+
+
+async def _timed_items(iterable, name):
+    iterator = aiter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            record_stage(name, time.perf_counter() - started)
+        yield item
+
+
+def timed_iter(iterable, name):
+    """Iterate an async iterable, timing only the awaits that fetch each item.
+
+    The consumer's own work between items (and, when several consumers
+    share the event loop, theirs) stays out of the stage. Returns the
+    iterable unchanged when --profile is off.
+    """
+    if _timings is None:
+        return iterable
+    return _timed_items(iterable, name)
+
+
+class Profiler:
+    """Low-overhead profiler written out as flamegraph input plus a summary.
+
+    "sample" mode walks the main thread's stack from a background thread
+    every interval and counts collapsed stacks (the folded format read by
+    flamegraph.pl and speedscope). "cprofile" mode runs cProfile instead,
+    which is exact but considerably slower and only written at shutdown.
+    Both modes record per-stage timings and rewrite their files every
+    snapshot_interval seconds so a killed process still leaves data behind.
+    alloc=True also records tracemalloc top-N allocations; it slows
+    allocation-heavy code several times over, so it is off by default.
+    """
+
+    def __init__(self, name, mode="sample", output_dir="profiles", interval=0.01,
+                 snapshot_interval=60, top=25, alloc=False):
+        self.name = name
+        self.mode = mode
+        self.alloc = alloc
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self.top = top
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.output_dir = os.path.join(output_dir, f"{name}-{stamp}")
+        self.timings = StageTimings()
+        self.stacks = Counter()
+        self.samples = 0
+        self.cprofile = None
+        self.started_at = None
+        self._main_thread_id = threading.main_thread().ident
+        self._owns_tracemalloc = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        global _timings
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.started_at = time.monotonic()
+        _timings = self.timings
+        if self.alloc and not tracemalloc.is_tracing():
+            # One frame per allocation keeps tracemalloc's overhead small
+            tracemalloc.start(1)
+            self._owns_tracemalloc = True
+        if self.mode == "cprofile":
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        print(f"🔬 Profiling ({self.mode}{', allocations' if self.alloc else ''}) to {self.output_dir}")
+
+    def stop(self):
+        global _timings
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self.cprofile:
+            self.cprofile.disable()
+        self.write_snapshot(final=True)
+        summary = self.summary()
+        with open(os.path.join(self.output_dir, "summary.txt"), "w") as f:
+            f.write(summary + "\n")
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        _timings = None
+        print(summary)
+        print(f"🔬 Profile written to {self.output_dir}")
+
+    def _run(self):
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while not self._stop.wait(self.interval):
+            if self.mode == "sample":
+                self._sample()
+            if time.monotonic() >= next_snapshot:
+                self.write_snapshot()
+                next_snapshot = time.monotonic() + self.snapshot_interval
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._main_thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_snapshot(self, final=False):
+        if self.mode == "sample":
+            with open(os.path.join(self.output_dir, "stacks.folded"), "w") as f:
+                for stack, count in self.stacks.copy().items():
+                    f.write(f"{stack} {count}\n")
+        if self.cprofile and final:
+            # dump_stats() disables the profiler, so cProfile data is only
+            # written once at shutdown
+            self.cprofile.dump_stats(os.path.join(self.output_dir, "cprofile.pstats"))
+        if self.alloc:
+            with open(os.path.join(self.output_dir, "allocations.txt"), "w") as f:
+                f.write(self.allocation_report() + "\n")
+        with open(os.path.join(self.output_dir, "stages.txt"), "w") as f:
+            f.write(self.timings.report() + "\n")
+
+    def allocation_report(self):
+        if not tracemalloc.is_tracing():
+            return "tracemalloc not running"
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced: {current / 1024 / 1024:.1f} MB (peak {peak / 1024 / 1024:.1f} MB)"]
+        for stat in tracemalloc.take_snapshot().statistics("lineno")[:self.top]:
+            lines.append(f"  {stat}")
+        return "\n".join(lines)
+
+    def hottest_functions(self):
+        """Self-sample counts per function (the leaf of each sampled stack)."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(self.top)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started_at
+        lines = [
+            "=" * 60,
+            f"Profile summary: {self.name} ({self.mode}, {elapsed:.1f}s)",
+            "=" * 60,
+            "",
+            "Stage timings:",
+            self.timings.report(),
+            "",
+        ]
+        if self.mode == "sample":
+            lines.append(f"Hottest functions ({self.samples} samples):")
+            for func, count in self.hottest_functions():
+                lines.append(f"  {count / max(self.samples, 1):>6.1%}  {func}")
+            lines.append("")
+        if self.alloc:
+            lines.append("Top allocations:")
+            lines.append(self.allocation_report())
+        return "\n".join(lines)
+
+
+def add_profile_arguments(parser):
+    """Add --profile and its options to an entry point's argument parser."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument(
+        "--profile", nargs="?", const="sample", choices=["sample", "cprofile"],
+        help="Profile this run (default mode: sample)",
+    )
+    group.add_argument("--profile-dir", default="profiles", help="Where profile output is written")
+    group.add_argument("--profile-interval", type=float, default=0.01,
+                       help="Seconds between stack samples")
+    group.add_argument("--profile-snapshot", type=float, default=60,
+                       help="Seconds between on-disk snapshots")
+    group.add_argument("--profile-top", type=int, default=25,
+                       help="Entries in the top-N reports")
+    group.add_argument("--profile-alloc", action="store_true",
+                       help="Also trace allocations with tracemalloc (much slower)")
+
+
+def profiler_from_args(name, args):
+    """Return a Profiler configured from parsed arguments, or None if --profile is off."""
+    if not args.profile:
+        return None
+    return Profiler(
+        name,
+        mode=args.profile,
+        output_dir=args.profile_dir,
+        interval=args.profile_interval,
+        snapshot_interval=args.profile_snapshot,
+        top=args.profile_top,
+        alloc=args.profile_alloc,
+    )
+
+
+def run_profiled(profiler, run):
+    """Call run(), wrapping it in the profiler if there is one."""
+    if profiler is None:
+        return run()
+    profiler.start()
+    try:
+        return run()
+    finally:
+        profiler.stop()
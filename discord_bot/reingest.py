@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Re-ingest From rawJson
+Rebuilds derived columns and tables from the payloads already stored in
+discord_messages.rawJson, without refetching anything through Discord.
+Messages are read in keyset ranges, parsed in a process pool and written
+back idempotently; progress is checkpointed so an interrupted run resumes
+where it stopped.
+
+Usage: python reingest.py [--derive mentions,replies,attachments] [--workers N]
+                          [--batch-size N] [--restart]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from mysql.connector import Error
+
+from db import INSERT_ATTACHMENT_SQL, INSERT_MENTION_SQL, get_connection
+from derive import DERIVERS, derive_batch
+
+# How each deriver's rows are written: ("insert", sql) runs an idempotent
+# multi-row INSERT; ("update", column) sets a discord_messages column from
+# (messageId, value) pairs
+WRITERS = {
+    "mentions": ("insert", INSERT_MENTION_SQL),
+    "replies": ("update", "replyToMessageId"),
+    "attachments": ("insert", INSERT_ATTACHMENT_SQL),
+}
+
+
+class _InlineExecutor:
+    """Runs submitted work immediately; used for --workers 0."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def load_checkpoint(name):
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM reingest_checkpoints WHERE name = %s", (name,))
+        return cursor.fetchone()
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def read_batch(cursor, after_id, size):
+    # discord_messages.id is a varchar, so this walks the primary key in
+    # string order; that is still a stable total order to resume from
+    cursor.execute(
+        """
+        SELECT id, rawJson FROM discord_messages
+        WHERE id > %s
+        ORDER BY id
+        LIMIT %s
+        """,
+        (after_id, size),
+    )
+    return cursor.fetchall()
+
+
+def update_column(cursor, column, pairs):
+    """Set discord_messages.<column> for many rows in one statement."""
+    values = " UNION ALL ".join(["SELECT %s AS id, %s AS value"] * len(pairs))
+    cursor.execute(
+        f"""
+        UPDATE discord_messages m
+        JOIN ({values}) v ON m.id = v.id
+        SET m.{column} = v.value
+        """,
+        [item for pair in pairs for item in pair],
+    )
+
+
+def write_batch(conn, results, checkpoint):
+    """Write one batch's derived rows and its checkpoint in a single transaction."""
+    cursor = conn.cursor()
+    try:
+        written = 0
+        for name, rows in results.items():
+            if not rows:
+                continue
+            kind, target = WRITERS[name]
+            if kind == "insert":
+                cursor.executemany(target, rows)
+            else:
+                update_column(cursor, target, rows)
+            written += len(rows)
+
+        cursor.execute(
+            """
+            INSERT INTO reingest_checkpoints (name, lastMessageId, messagesProcessed, rowsWritten, finishedAt)
+            VALUES (%s, %s, %s, %s, NULL)
+            ON DUPLICATE KEY UPDATE
+                lastMessageId = VALUES(lastMessageId),
+                messagesProcessed = messagesProcessed + VALUES(messagesProcessed),
+                rowsWritten = rowsWritten + %s,
+                finishedAt = NULL
+            """,
+            (checkpoint["name"], checkpoint["last_id"], checkpoint["count"], written, written),
+        )
+        conn.commit()
+        return written
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def finish(name):
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            INSERT INTO reingest_checkpoints (name, finishedAt) VALUES (%s, NOW())
+            ON DUPLICATE KEY UPDATE finishedAt = NOW()
+            """,
+            (name,),
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild derived tables from stored rawJson")
+    parser.add_argument("--derive", default=",".join(DERIVERS),
+                        help=f"Comma-separated derivers to run (available: {', '.join(DERIVERS)})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Parser processes (0 = parse in this process)")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Messages per keyset range")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    names = sorted({n.strip() for n in args.derive.split(",") if n.strip()})
+    unknown = [n for n in names if n not in DERIVERS]
+    if not names or unknown:
+        print(f"Error: unknown deriver(s): {', '.join(unknown) or '(none given)'}")
+        sys.exit(1)
+    name = ",".join(names)
+
+    try:
+        saved = None if args.restart else load_checkpoint(name)
+    except Error as e:
+        print(f"❌ Error reading checkpoint: {e}")
+        sys.exit(1)
+
+    if saved and saved["finishedAt"]:
+        print(f"Re-ingest of {name} already finished at {saved['finishedAt']} (use --restart to run again)")
+        return
+    after_id = saved["lastMessageId"] if saved and saved["lastMessageId"] else ""
+    if after_id:
+        print(f"Resuming {name} after message {after_id} ({saved['messagesProcessed']} already processed)")
+    else:
+        print(f"Re-ingesting {name} from the start")
+        if args.restart:
+            # Reset the counters; rows already written are rewritten idempotently
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM reingest_checkpoints WHERE name = %s", (name,))
+            conn.commit()
+            cursor.close()
+            conn.close()
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 0 else _InlineExecutor()
+    in_flight = max(args.workers, 1) * 2
+    reader = get_connection()
+    writer = get_connection()
+    read_cursor = reader.cursor()
+
+    processed = 0
+    written = 0
+    bad_json = 0
+    started = time.monotonic()
+    try:
+        with executor:
+            pending = deque()
+            exhausted = False
+            while pending or not exhausted:
+                # Keep every worker busy, but only a bounded number of ranges in memory
+                while not exhausted and len(pending) < in_flight:
+                    rows = read_batch(read_cursor, after_id, args.batch_size)
+                    # End the read transaction so TiDB/MySQL don't hold an old snapshot
+                    reader.commit()
+                    if not rows:
+                        exhausted = True
+                        break
+                    after_id = rows[-1][0]
+                    pending.append((executor.submit(derive_batch, rows, names), after_id, len(rows)))
+
+                if not pending:
+                    break
+
+                # Write in submission order so the checkpoint only ever moves forward
+                future, last_id, count = pending.popleft()
+                results, errors = future.result()
+                written += write_batch(writer, results, {"name": name, "last_id": last_id, "count": count})
+                processed += count
+                bad_json += len(errors)
+                for message_id in errors:
+                    print(f"⚠️  Unparseable rawJson in message {message_id}")
+
+                elapsed = time.monotonic() - started
+                print(f"  {processed} messages, {written} rows written "
+                      f"({processed / elapsed:.0f} msg/s), at {last_id}")
+
+        finish(name)
+    except Error as e:
+        print(f"❌ Database error, stopping (rerun to resume from the last checkpoint): {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun to resume from the last checkpoint")
+        sys.exit(1)
+    finally:
+        read_cursor.close()
+        reader.close()
+        writer.close()
+
+    print("=" * 60)
+    print(f"Re-ingest complete: {name}")
+    print(f"  Messages processed: {processed}")
+    print(f"  Rows written: {written}")
+    if bad_json:
+        print(f"  Unparseable rawJson: {bad_json}")
+    print(f"  Time: {time.monotonic() - started:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# runtime.py - Shared bot construction and the low-memory runtime profile
+import asyncio
+import os
+import sys
+import tracemalloc
+from collections import OrderedDict
+
+import discord
+from discord.ext import commands
+from dotenv import load_dotenv
+
+from scheduler import BACKFILL, install_scheduler
+
+load_dotenv()
+
+
+def _env_flag(name, default="0"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+# LOW_MEMORY=1 bounds discord.py's caches instead of keeping every guild's
+# full member list and the default 1000-message cache resident.
+LOW_MEMORY = _env_flag("LOW_MEMORY")
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", "100"))
+# Number of recently written author IDs remembered to skip repeat upserts
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+# Seconds between memory reports (0 = disabled)
+MEMORY_REPORT_INTERVAL = int(os.getenv("MEMORY_REPORT_INTERVAL", "0"))
+# Also trace Python allocations (adds overhead, use while investigating)
+MEMORY_TRACEMALLOC = _env_flag("MEMORY_TRACEMALLOC")
+
+
+def make_bot(members=True, message_content=True, priority=BACKFILL):
+    """Create the commands.Bot used by the bot scripts.
+
+    In the low-memory profile members are resolved lazily from message
+    payloads: guilds are not chunked at startup and the member cache is off.
+    The bot's REST requests go through the shared scheduler at priority
+    unless a request_priority() block says otherwise.
+    """
+    intents = discord.Intents.default()
+    intents.message_content = message_content
+    intents.guilds = True
+    intents.members = members
+
+    options = {}
+    if LOW_MEMORY:
+        options["max_messages"] = MESSAGE_CACHE_SIZE or None
+        options["chunk_guilds_at_startup"] = False
+        options["member_cache_flags"] = discord.MemberCacheFlags.none()
+
+    bot = commands.Bot(command_prefix="!", intents=intents, **options)
+    install_scheduler(bot, priority)
+    return bot
+
+
+class RecentIds:
+    """Bounded LRU set of IDs, used to avoid re-upserting the same author.
+
+    Only add() an ID once its upsert has succeeded, so a failed write is
+    retried on the author's next message.
+    """
+
+    def __init__(self, maxsize=USER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, key):
+        # A hit counts as a use, keeping active authors in the cache
+        if key in self._ids:
+            self._ids.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key):
+        self._ids[key] = None
+        self._ids.move_to_end(key)
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None if unavailable."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _mb(value):
+    return f"{value / (1024 * 1024):.1f} MB" if value is not None else "n/a"
+
+
+def memory_report(bot=None, top=10):
+    """Return a multi-line RSS/tracemalloc report."""
+    lines = [f"RSS: {_mb(rss_bytes())} (peak {_mb(peak_rss_bytes())})"]
+
+    if bot is not None:
+        cached_members = sum(len(g.members) for g in bot.guilds)
+        lines.append(
+            f"Caches: {len(bot.guilds)} guilds, {cached_members} members, "
+            f"{len(bot.cached_messages)} messages"
+        )
+
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f"Traced: {_mb(current)} (peak {_mb(peak)})")
+        stats = tracemalloc.take_snapshot().statistics("lineno")
+        for stat in stats[:top]:
+            lines.append(f"  {stat}")
+
+    return "\n".join(lines)
+
+
+async def _report_memory(bot, interval, extra):
+    while not bot.is_closed():
+        print(f"📊 {memory_report(bot)}")
+        for report in extra:
+            print(f"📊 {report()}")
+        await asyncio.sleep(interval)
+
+
+def start_memory_reporter(bot, extra=None):
+    """Start periodic memory reports if MEMORY_REPORT_INTERVAL is set.
+
+    extra is an optional callable, or list of callables, each returning
+    another line to print with each report. Safe to call from on_ready,
+    which can fire again after a reconnect.
+    """
+    if MEMORY_REPORT_INTERVAL <= 0 or getattr(bot, "_memory_reporter", None):
+        return
+    if MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if callable(extra):
+        extra = [extra]
+    bot._memory_reporter = asyncio.get_running_loop().create_task(
+        _report_memory(bot, MEMORY_REPORT_INTERVAL, extra or [])
+    )
@@ -0,0 +1,360 @@
+# scheduler.py - Priority-aware Discord REST scheduler shared by the bot scripts
+#
+# Every REST request a bot makes goes through RestScheduler before it reaches
+# discord.py's own rate limiter. Requests are admitted in priority order
+# against a global request budget that is shared, through a small locked
+# state file, by every script running on this host with the same token:
+#
+#   LIVE > RECONCILIATION > BACKFILL > MAINTENANCE
+#
+# The budget is a GCRA (generic cell rate algorithm) limiter: requests are
+# spaced 1/DISCORD_GLOBAL_RATE apart, and each class may run ahead of that
+# schedule by its share of DISCORD_GLOBAL_BURST. Background classes get the
+# smallest share, so however busy a backfill keeps the budget there is always
+# headroom left for live posts to go out immediately.
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import aiohttp
+from dotenv import load_dotenv
+
+from profiling import record_stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: the budget is tracked per process only
+    fcntl = None
+
+load_dotenv()
+
+LIVE, RECONCILIATION, BACKFILL, MAINTENANCE = range(4)
+PRIORITY_NAMES = ("live", "reconciliation", "backfill", "maintenance")
+# Fraction of the burst allowance each class may use
+BURST_SHARE = (1.0, 0.6, 0.3, 0.0)
+
+# Requests per second across all scripts; Discord's global limit is 50
+GLOBAL_RATE = float(os.getenv("DISCORD_GLOBAL_RATE", "40"))
+# Seconds live requests may run ahead of the steady rate
+GLOBAL_BURST = float(os.getenv("DISCORD_GLOBAL_BURST", "0.25"))
+# Shared budget file ("" = per-process only); defaults to one per token in the temp dir
+STATE_PATH = os.getenv("DISCORD_SCHEDULER_STATE")
+# Discord bans a token for an hour after 10,000 invalid (401/403/429)
+# requests in 10 minutes; backfill and maintenance stop well before that
+INVALID_BUDGET = int(os.getenv("DISCORD_INVALID_BUDGET", "5000"))
+INVALID_WINDOW = 600
+
+_priority = ContextVar("discord_request_priority", default=None)
+_route = ContextVar("discord_request_route", default=None)
+
+
+@contextmanager
+def request_priority(priority):
+    """Run the Discord requests made inside the block at the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Bucket:
+    """Last known state of one route's rate limit bucket."""
+
+    __slots__ = ("remaining", "reset_at", "in_flight")
+
+    def __init__(self):
+        self.remaining = None  # unknown until the first response
+        self.reset_at = 0.0
+        self.in_flight = 0
+
+    def wait_time(self, now):
+        if self.remaining is None or now >= self.reset_at:
+            return 0.0
+        if self.remaining - self.in_flight > 0:
+            return 0.0
+        return self.reset_at - now
+
+
+class _SharedState:
+    """The global budget, kept in a locked file so processes share it.
+
+    Holds the GCRA theoretical arrival time, a global-429 pause and the
+    invalid request count for the current window, all as wall-clock times.
+    """
+
+    FIELDS = ("tat", "paused_until", "invalid_start", "invalid_count")
+
+    def __init__(self):
+        self.values = dict.fromkeys(self.FIELDS, 0.0)
+        self.path = None
+        self._fd = None
+
+    def open(self, token):
+        path = STATE_PATH
+        if path is None and token:
+            digest = hashlib.sha256(token.encode()).hexdigest()[:16]
+            path = os.path.join(tempfile.gettempdir(), f"discord-rest-{digest}.state")
+        if not path or fcntl is None:
+            return
+        try:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            self.path = path
+        except OSError as e:
+            print(f"⚠️  Could not open {path} ({e}); rate budget is not shared with other scripts")
+
+    def __enter__(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            fields = os.read(self._fd, 256).split()
+            try:
+                if len(fields) == len(self.FIELDS):
+                    self.values = dict(zip(self.FIELDS, map(float, fields)))
+            except ValueError:
+                pass
+        return self.values
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            data = " ".join(f"{self.values[f]:.6f}" for f in self.FIELDS).encode()
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            os.ftruncate(self._fd, 0)
+            os.write(self._fd, data)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return False
+
+
+class RestScheduler:
+    """Admits Discord REST requests by priority under per-route and global limits.
+
+    Per-route buckets are tracked from the X-RateLimit headers of every
+    response, so a request for an exhausted bucket waits for its reset
+    instead of taking a global slot. 429s are counted by scope, and a global
+    429 pauses every class in every process until Retry-After has passed.
+    """
+
+    def __init__(self):
+        self.state = _SharedState()
+        self.buckets = {}
+        self._queue = []  # (priority, seq, future)
+        self._seq = itertools.count()
+        self._loop = None
+        self._wake = None
+        self._dispatcher = None
+        self._opened = False
+        self._warned_invalid = False
+        self.stats = {
+            "queued": [0] * len(PRIORITY_NAMES),
+            "admitted": [0] * len(PRIORITY_NAMES),
+            "wait_total": [0.0] * len(PRIORITY_NAMES),
+            "wait_max": [0.0] * len(PRIORITY_NAMES),
+            "bucket_waits": 0,
+            "responses": 0,
+            "rate_limited": 0,
+            "rate_limited_global": 0,
+            "rate_limited_shared": 0,
+            "invalid": 0,
+        }
+
+    def _bucket(self, route):
+        key = f"{route.key}:{route.major_parameters}"
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= 512:
+                now = time.monotonic()
+                for stale in [k for k, b in self.buckets.items() if b.reset_at < now and not b.in_flight]:
+                    del self.buckets[stale]
+            bucket = self.buckets[key] = _Bucket()
+        return bucket
+
+    async def request(self, route, send, priority, token):
+        """Wait for route's bucket and a global slot at priority, then await send()."""
+        if not self._opened:
+            self.state.open(token)
+            self._opened = True
+
+        started = time.monotonic()
+        bucket = self._bucket(route)
+        delay = bucket.wait_time(started)
+        if delay:
+            self.stats["bucket_waits"] += 1
+            while delay:
+                await asyncio.sleep(delay)
+                delay = bucket.wait_time(time.monotonic())
+        bucket.in_flight += 1
+        try:
+            await self._admit(priority)
+            waited = time.monotonic() - started
+            record_stage("rest_queue", waited)
+            self.stats["admitted"][priority] += 1
+            self.stats["wait_total"][priority] += waited
+            self.stats["wait_max"][priority] = max(self.stats["wait_max"][priority], waited)
+
+            route_token = _route.set(route)
+            try:
+                return await send()
+            finally:
+                _route.reset(route_token)
+        finally:
+            bucket.in_flight -= 1
+
+    async def _admit(self, priority):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # bot.run()/asyncio.run() each start a new loop
+            self._loop = loop
+            self._queue = []
+            self._wake = asyncio.Event()
+            self._dispatcher = None
+        waiter = (priority, next(self._seq), loop.create_future())
+        heapq.heappush(self._queue, waiter)
+        self.stats["queued"][priority] += 1
+        self._wake.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+        try:
+            await waiter[2]
+        finally:
+            self.stats["queued"][priority] -= 1
+
+    async def _dispatch(self):
+        # Strict priority: only the head of the queue is considered, and a
+        # newly queued request wakes the dispatcher in case it ranks higher
+        while self._queue:
+            priority, _, future = self._queue[0]
+            if future.done():  # cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            delay = self._try_take(priority)
+            if delay <= 0:
+                heapq.heappop(self._queue)
+                future.set_result(None)
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _try_take(self, priority):
+        """Take a global slot for priority, or return the seconds until one may free up."""
+        now = time.time()
+        with self.state as s:
+            if s["paused_until"] > now:
+                return s["paused_until"] - now
+            if (priority >= BACKFILL and s["invalid_count"] >= INVALID_BUDGET
+                    and now - s["invalid_start"] < INVALID_WINDOW):
+                if not self._warned_invalid:
+                    print(f"⚠️  {int(s['invalid_count'])} invalid Discord requests in the last "
+                          f"{INVALID_WINDOW // 60} minutes; pausing background requests")
+                    self._warned_invalid = True
+                return s["invalid_start"] + INVALID_WINDOW - now
+            tat = max(s["tat"], now)
+            ahead = tat - now - GLOBAL_BURST * BURST_SHARE[priority]
+            if ahead > 0:
+                return ahead
+            s["tat"] = tat + 1 / GLOBAL_RATE
+            return 0
+
+    def observe(self, response):
+        """Update bucket state and 429 counters from a response's headers."""
+        headers = response.headers
+        status = response.status
+        self.stats["responses"] += 1
+
+        route = _route.get()
+        remaining = headers.get("X-RateLimit-Remaining")
+        if route is not None and remaining is not None:
+            bucket = self._bucket(route)
+            bucket.remaining = int(remaining)
+            bucket.reset_at = time.monotonic() + float(headers.get("X-RateLimit-Reset-After", 0))
+
+        if status not in (401, 403, 429):
+            return
+        scope = headers.get("X-RateLimit-Scope")
+        now = time.time()
+        with self.state as s:
+            # 429s on shared resources don't count towards the invalid request limit
+            if scope != "shared":
+                self.stats["invalid"] += 1
+                if now - s["invalid_start"] >= INVALID_WINDOW:
+                    s["invalid_start"] = now
+                    s["invalid_count"] = 0
+                    self._warned_invalid = False
+                s["invalid_count"] += 1
+            if status == 429:
+                self.stats["rate_limited"] += 1
+                if scope == "shared":
+                    self.stats["rate_limited_shared"] += 1
+                if headers.get("X-RateLimit-Global") == "true" or scope == "global":
+                    self.stats["rate_limited_global"] += 1
+                    retry_after = float(headers.get("Retry-After", 1))
+                    s["paused_until"] = max(s["paused_until"], now + retry_after)
+
+    def snapshot(self):
+        return {key: list(value) if isinstance(value, list) else value for key, value in self.stats.items()} | {
+            "buckets": len(self.buckets),
+            "shared": self.state.path is not None,
+        }
+
+
+rest_scheduler = RestScheduler()
+
+
+def _trace_config(scheduler):
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_end(session, context, params):
+        scheduler.observe(params.response)
+
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+
+def install_scheduler(bot, priority=BACKFILL):
+    """Route bot's REST requests through rest_scheduler.
+
+    priority is used for requests made outside a request_priority() block.
+    Must be called before the bot logs in.
+    """
+    http = bot.http
+    if http.http_trace is None:
+        http.http_trace = _trace_config(rest_scheduler)
+    send_request = http.request
+
+    async def request(route, **kwargs):
+        current = _priority.get()
+        return await rest_scheduler.request(
+            route,
+            lambda: send_request(route, **kwargs),
+            priority if current is None else current,
+            http.token,
+        )
+
+    http.request = request
+    return rest_scheduler
+
+
+def scheduler_report():
+    """One-line summary of REST queue depth, waits and rate limit hits."""
+    s = rest_scheduler.snapshot()
+    queued = ", ".join(f"{name} {s['queued'][i]}" for i, name in enumerate(PRIORITY_NAMES))
+    waits = ", ".join(
+        f"{name} {s['admitted'][i]} (avg {s['wait_total'][i] / s['admitted'][i] * 1000:.0f} ms "
+        f"max {s['wait_max'][i] * 1000:.0f} ms)"
+        for i, name in enumerate(PRIORITY_NAMES)
+        if s["admitted"][i]
+    )
+    return (
+        f"Discord REST: queued {queued} | sent {waits or 'none'} | "
+        f"{s['rate_limited']} 429s ({s['rate_limited_global']} global, {s['rate_limited_shared']} shared), "
+        f"{s['invalid']} invalid, {s['bucket_waits']} bucket waits, {s['buckets']} buckets"
+        f"{'' if s['shared'] else ' (budget not shared)'}"
+    )
@@ -0,0 +1,44 @@
+# serialize.py - Build the rawJson payload stored alongside each message
+
+
+def build_raw_data(message):
+    """Create a serializable dictionary of message data.
+
+    Only plain strings/bools/ints are copied out so the returned dict holds
+    no references back to discord.py objects, letting the message itself be
+    dropped as soon as it has been written.
+    """
+    return {
+        "id": str(message.id),
+        "content": message.content,
+        "author": {
+            "id": str(message.author.id),
+            "name": message.author.name,
+            "discriminator": getattr(message.author, "discriminator", None),
+            "bot": message.author.bot,
+        },
+        "channel_id": str(message.channel.id),
+        "guild_id": str(message.guild.id) if message.guild else None,
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+        "pinned": message.pinned,
+        "tts": message.tts,
+        "mention_everyone": message.mention_everyone,
+        "mentions": [str(u.id) for u in message.mentions],
+        "attachments": [
+            {
+                "id": str(a.id),
+                "filename": a.filename,
+                "url": a.url,
+                "size": a.size,
+                "content_type": a.content_type,
+            }
+            for a in message.attachments
+        ],
+        # Kept so reingest.py can derive replies and embeds without refetching
+        "reference": {
+            "message_id": str(message.reference.message_id) if message.reference.message_id else None,
+            "channel_id": str(message.reference.channel_id),
+        } if message.reference else None,
+        "embeds": [e.to_dict() for e in message.embeds],
+    }
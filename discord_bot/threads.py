@@ -0,0 +1,75 @@
+# threads.py - Thread and forum-post enumeration
+import asyncio
+import os
+
+import discord
+
+# Number of channels whose archived threads are listed at the same time
+THREAD_CONCURRENCY = int(os.getenv("THREAD_CONCURRENCY", "5"))
+
+
+def thread_parents(guild):
+    """Channels that can contain threads: text channels and forums."""
+    return [
+        ch for ch in guild.channels
+        if isinstance(ch, (discord.TextChannel, discord.ForumChannel))
+    ]
+
+
+async def _archived_threads(channel, cutoff, private):
+    threads = []
+    kwargs = {"private": True} if private else {}
+    # Archived threads are returned most recently archived first, and
+    # discord.py pages through them for us when limit=None
+    async for thread in channel.archived_threads(limit=None, **kwargs):
+        if cutoff and thread.archive_timestamp < cutoff:
+            break
+        threads.append(thread)
+    return threads
+
+
+async def enumerate_threads(guild, parents=None, cutoff=None, concurrency=THREAD_CONCURRENCY):
+    """Return every active and archived thread under the given parent channels.
+
+    Active threads come from a single guild-wide request; archived public and
+    private threads are listed per channel, several channels at a time.
+    Threads archived before cutoff are skipped since they cannot contain
+    newer messages.
+    """
+    if parents is None:
+        parents = thread_parents(guild)
+    parent_ids = {p.id for p in parents}
+    found = {}
+
+    try:
+        for thread in await guild.active_threads():
+            if thread.parent_id in parent_ids:
+                found[thread.id] = thread
+    except discord.HTTPException as e:
+        print(f"  ✗ Could not list active threads: {e}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(channel, private):
+        async with semaphore:
+            try:
+                return await _archived_threads(channel, cutoff, private)
+            except discord.Forbidden:
+                return []
+            except discord.HTTPException as e:
+                print(f"  ✗ Could not list archived threads in #{channel.name}: {e}")
+                return []
+
+    me = guild.me
+    jobs = [fetch(p, False) for p in parents]
+    # Private archived threads need Manage Threads and only exist in text channels
+    jobs += [
+        fetch(p, True) for p in parents
+        if isinstance(p, discord.TextChannel) and me and p.permissions_for(me).manage_threads
+    ]
+
+    for threads in await asyncio.gather(*jobs):
+        for thread in threads:
+            found.setdefault(thread.id, thread)
+
+    return list(found.values())
@@ -0,0 +1 @@
+ALTER TABLE `discord_channels` ADD `parentId` varchar(64);
\ No newline at end of file
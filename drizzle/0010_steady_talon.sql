@@ -0,0 +1,18 @@
+CREATE TABLE `backfill_work_items` (
+	`channelId` varchar(64) NOT NULL,
+	`guildId` varchar(64) NOT NULL,
+	`channelName` text NOT NULL,
+	`status` enum('pending','leased','done','failed') NOT NULL DEFAULT 'pending',
+	`notBefore` timestamp,
+	`cursorMessageId` varchar(64),
+	`messagesArchived` int NOT NULL DEFAULT 0,
+	`attempts` int NOT NULL DEFAULT 0,
+	`leaseOwner` varchar(128),
+	`leaseToken` varchar(64),
+	`leaseExpiresAt` timestamp,
+	`heartbeatAt` timestamp,
+	`lastError` text,
+	`createdAt` timestamp NOT NULL DEFAULT (now()),
+	`updatedAt` timestamp NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP,
+	CONSTRAINT `backfill_work_items_channelId` PRIMARY KEY(`channelId`)
+);
\ No newline at end of file
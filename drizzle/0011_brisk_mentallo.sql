@@ -0,0 +1,18 @@
+CREATE TABLE `discord_message_mentions` (
+	`messageId` varchar(64) NOT NULL,
+	`userId` varchar(64) NOT NULL,
+	CONSTRAINT `discord_message_mentions_messageId_userId_pk` PRIMARY KEY(`messageId`,`userId`)
+);
+--> statement-breakpoint
+CREATE TABLE `reingest_checkpoints` (
+	`name` varchar(128) NOT NULL,
+	`lastMessageId` varchar(64),
+	`messagesProcessed` int NOT NULL DEFAULT 0,
+	`rowsWritten` int NOT NULL DEFAULT 0,
+	`finishedAt` timestamp,
+	`updatedAt` timestamp NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP,
+	CONSTRAINT `reingest_checkpoints_name` PRIMARY KEY(`name`)
+);
+--> statement-breakpoint
+ALTER TABLE `discord_messages` ADD `replyToMessageId` varchar(64);--> statement-breakpoint
+ALTER TABLE `discord_message_mentions` ADD CONSTRAINT `discord_message_mentions_messageId_discord_messages_id_fk` FOREIGN KEY (`messageId`) REFERENCES `discord_messages`(`id`) ON DELETE cascade ON UPDATE no action;
\ No newline at end of file
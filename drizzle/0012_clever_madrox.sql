@@ -0,0 +1,3 @@
+ALTER TABLE `meetings` ADD `matchConfidence` int;--> statement-breakpoint
+ALTER TABLE `meetings` ADD `matchMethod` varchar(32);--> statement-breakpoint
+ALTER TABLE `meetings` ADD `matchedAt` timestamp;
\ No newline at end of file
@@ -0,0 +1,3 @@
+CREATE INDEX `backfill_work_items_claim_idx` ON `backfill_work_items` (`status`,`guildId`,`createdAt`);--> statement-breakpoint
+CREATE INDEX `backfill_work_items_lease_expiry_idx` ON `backfill_work_items` (`status`,`leaseExpiresAt`);--> statement-breakpoint
+CREATE INDEX `backfill_work_items_lease_token_idx` ON `backfill_work_items` (`leaseToken`);
\ No newline at end of file
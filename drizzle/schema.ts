@@ -1,4 +1,4 @@
-import { int, mysqlEnum, mysqlTable, text, timestamp, varchar } from "drizzle-orm/mysql-core";
+import { index, int, mysqlEnum, mysqlTable, primaryKey, text, timestamp, varchar } from "drizzle-orm/mysql-core";
 
 /**
  * Core user table backing auth flow.
@@ -39,6 +39,7 @@ export const discordChannels = mysqlTable("discord_channels", {
   guildId: varchar("guildId", { length: 64 }).notNull().references(() => discordGuilds.id, { onDelete: "cascade" }),
   name: text("name").notNull(),
   type: varchar("type", { length: 32 }).notNull(), // text, voice, forum, etc.
+  parentId: varchar("parentId", { length: 64 }), // Parent channel ID for threads and forum posts
   clientWebsite: text("clientWebsite"), // Optional: client's website URL
   clientBusinessName: text("clientBusinessName"), // Optional: client's business name
   tags: text("tags"), // Comma-separated tags for grouping/filtering
@@ -67,9 +68,18 @@ export const discordMessages = mysqlTable("discord_messages", {
   isPinned: int("isPinned").default(0).notNull(),
   isTts: int("isTts").default(0).notNull(),
   rawJson: text("rawJson"), // Full message payload for future use
+  replyToMessageId: varchar("replyToMessageId", { length: 64 }), // Set when archived; older rows filled from rawJson by reingest.py
   insertedAt: timestamp("insertedAt").defaultNow().notNull(), // When we wrote it to DB
 });
 
+// User mentions per message (written when archived; older rows derived from rawJson by reingest.py)
+export const discordMessageMentions = mysqlTable("discord_message_mentions", {
+  messageId: varchar("messageId", { length: 64 }).notNull().references(() => discordMessages.id, { onDelete: "cascade" }),
+  userId: varchar("userId", { length: 64 }).notNull(), // Mentioned Discord user ID (may not be in discord_users)
+}, (table) => [
+  primaryKey({ columns: [table.messageId, table.userId] }),
+]);
+
 export const discordAttachments = mysqlTable("discord_attachments", {
   id: varchar("id", { length: 64 }).primaryKey(), // Discord attachment ID
   messageId: varchar("messageId", { length: 64 }).notNull().references(() => discordMessages.id, { onDelete: "cascade" }),
@@ -158,6 +168,9 @@ export const meetings = mysqlTable("meetings", {
   rawPayload: text("rawPayload"), // Full webhook payload for reference
   receivedAt: timestamp("receivedAt").defaultNow().notNull(),
   matchedChannelId: varchar("matchedChannelId", { length: 64 }), // Discord channel ID if matched
+  matchConfidence: int("matchConfidence"), // 0-100, set by discord_bot/match_meetings.py
+  matchMethod: varchar("matchMethod", { length: 32 }), // email, domain, contact_name, title
+  matchedAt: timestamp("matchedAt"), // When the matcher last evaluated this meeting
 });
 
 export type ChatConversation = typeof chatConversations.$inferSelect;
@@ -228,3 +241,40 @@ export type GhlLocation = typeof ghlLocations.$inferSelect;
 export type InsertGhlLocation = typeof ghlLocations.$inferInsert;
 export type A2pStatus = typeof a2pStatus.$inferSelect;
 export type InsertA2pStatus = typeof a2pStatus.$inferInsert;
+
+// Distributed backfill work queue (one row per channel/thread, leased by backfill workers)
+export const backfillWorkItems = mysqlTable("backfill_work_items", {
+  channelId: varchar("channelId", { length: 64 }).primaryKey(), // Discord channel or thread ID
+  guildId: varchar("guildId", { length: 64 }).notNull(),
+  channelName: text("channelName").notNull(),
+  status: mysqlEnum("status", ["pending", "leased", "done", "failed"]).default("pending").notNull(),
+  notBefore: timestamp("notBefore"), // Oldest message date to archive; null = full history
+  cursorMessageId: varchar("cursorMessageId", { length: 64 }), // Oldest message archived so far (resume point)
+  messagesArchived: int("messagesArchived").default(0).notNull(),
+  attempts: int("attempts").default(0).notNull(),
+  leaseOwner: varchar("leaseOwner", { length: 128 }), // Worker holding the lease (host:pid)
+  leaseToken: varchar("leaseToken", { length: 64 }), // Unique per claim, guards against stale workers
+  leaseExpiresAt: timestamp("leaseExpiresAt"),
+  heartbeatAt: timestamp("heartbeatAt"),
+  lastError: text("lastError"),
+  createdAt: timestamp("createdAt").defaultNow().notNull(),
+  updatedAt: timestamp("updatedAt").defaultNow().onUpdateNow().notNull(),
+}, (table) => [
+  // Claims scan pending items per guild in createdAt order, plus expired leases
+  index("backfill_work_items_claim_idx").on(table.status, table.guildId, table.createdAt),
+  index("backfill_work_items_lease_expiry_idx").on(table.status, table.leaseExpiresAt),
+  index("backfill_work_items_lease_token_idx").on(table.leaseToken),
+]);
+
+export type BackfillWorkItem = typeof backfillWorkItems.$inferSelect;
+export type InsertBackfillWorkItem = typeof backfillWorkItems.$inferInsert;
+
+// Resume points for reingest.py rebuilds (one row per set of derived tables)
+export const reingestCheckpoints = mysqlTable("reingest_checkpoints", {
+  name: varchar("name", { length: 128 }).primaryKey(), // Comma-separated deriver names
+  lastMessageId: varchar("lastMessageId", { length: 64 }), // Keyset position in discord_messages.id order
+  messagesProcessed: int("messagesProcessed").default(0).notNull(),
+  rowsWritten: int("rowsWritten").default(0).notNull(),
+  finishedAt: timestamp("finishedAt"),
+  updatedAt: timestamp("updatedAt").defaultNow().onUpdateNow().notNull(),
+});